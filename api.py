@@ -0,0 +1,298 @@
+import json
+from datetime import date, datetime
+
+from flask import Blueprint, abort, current_app, request
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+import queries
+from async_reads import async_reads
+from cache import response_cache
+from models import Venue, Artist, Show
+
+api = Blueprint("api", __name__, url_prefix="/api/v1")
+
+# Ids are Postgres integers; anything larger would fail the query.
+MAX_ID = 2**31 - 1
+
+# Field names match the dicts the HTML views render.
+VENUE_FIELDS = {
+    "id": Venue.id,
+    "name": Venue.name,
+    "genres": Venue.genres,
+    "address": Venue.address,
+    "city": Venue.city,
+    "state": Venue.state,
+    "phone": Venue.phone,
+    "website": Venue.website_link,
+    "facebook_link": Venue.facebook_link,
+    "seeking_talent": Venue.looking_for_talent,
+    "seeking_description": Venue.seeking_description,
+    "image_link": Venue.image_link,
+}
+ARTIST_FIELDS = {
+    "id": Artist.id,
+    "name": Artist.name,
+    "genres": Artist.genres,
+    "city": Artist.city,
+    "state": Artist.state,
+    "phone": Artist.phone,
+    "website": Artist.website_link,
+    "facebook_link": Artist.facebook_link,
+    "seeking_venue": Artist.looking_for_venue,
+    "seeking_description": Artist.seeking_description,
+    "image_link": Artist.image_link,
+}
+SHOWS_FIELDS = (
+    "past_shows",
+    "upcoming_shows",
+    "past_shows_count",
+    "upcoming_shows_count",
+    "past_shows_next_cursor",
+)
+SHOW_FIELDS = (
+    "venue_id",
+    "venue_name",
+    "artist_id",
+    "artist_name",
+    "artist_image_link",
+    "start_time",
+)
+SEARCH_FIELDS = ("id", "name", "num_upcoming_shows")
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(payload):
+    """Encode ``payload`` with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, default=_default, separators=(",", ":"))
+
+
+def _json(payload, status=200):
+    return current_app.response_class(
+        dumps(payload), status=status, mimetype="application/json"
+    )
+
+
+def _int_arg(name, default=None):
+    value = request.args.get(name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        abort(400, f"{name} must be an integer")
+
+
+def _per_page():
+    per_page = _int_arg("limit", current_app.config["API_PAGE_SIZE"])
+    return min(max(per_page, 1), current_app.config["API_MAX_PAGE_SIZE"])
+
+
+def _fields(allowed):
+    """The names in ?fields=a,b, or all of ``allowed`` without it."""
+    value = request.args.get("fields")
+    if not value:
+        return list(allowed)
+    names = [name.strip() for name in value.split(",") if name.strip()]
+    unknown = [name for name in names if name not in allowed]
+    if unknown:
+        abort(
+            400,
+            f"Unknown fields {', '.join(unknown)}; "
+            f"expected some of {', '.join(allowed)}",
+        )
+    return names
+
+
+def _pick(item, names):
+    return {name: item[name] for name in names}
+
+
+def _list(model, fields):
+    # Only the requested columns are selected; id is always fetched for the
+    # cursor.
+    names = _fields(fields)
+    columns = [fields[name].label(name) for name in names]
+    if "id" not in names:
+        columns.append(model.id.label("id"))
+    rows, has_next = queries.id_page(
+        columns, model.id, after=_int_arg("after"), per_page=_per_page()
+    )
+    return _json(
+        {
+            "data": [_pick(row._mapping, names) for row in rows],
+            "next_cursor": rows[-1].id if rows and has_next else None,
+        }
+    )
+
+
+def _detail(model, fields, entity_id, shows_statement, prefix):
+    names = _fields(list(fields) + list(SHOWS_FIELDS))
+    columns = [fields[name].label(name) for name in names if name in fields]
+    statements = [
+        queries.detail_statement(model, entity_id, columns or [model.id.label("id")])
+    ]
+    with_shows = any(name in SHOWS_FIELDS for name in names)
+    if with_shows:
+        statements.append(
+            shows_statement(
+                entity_id, past_limit=current_app.config["PAST_SHOWS_PER_PAGE"]
+            )
+        )
+
+    results = async_reads.fetch_all(*statements)
+    if not results[0]:
+        abort(404, f"No {model.__name__.lower()} {entity_id}")
+    item = dict(results[0][0]._mapping)
+    if with_shows:
+        item.update(queries.partition_shows(results[1], prefix))
+    return _json(_pick(item, names))
+
+
+def _batch_ids():
+    # ?ids=1,2,3, or {"ids": [1, 2, 3]} posted as JSON for long lists.
+    if request.is_json:
+        body = request.get_json(silent=True)
+        if not isinstance(body, dict):
+            abort(400, 'Expected a JSON object like {"ids": [1, 2, 3]}')
+        values = body.get("ids") or []
+        if not isinstance(values, list):
+            abort(400, "ids must be a list")
+    else:
+        values = request.args.get("ids", "").split(",")
+    try:
+        ids = list(dict.fromkeys(int(value) for value in values if str(value).strip()))
+    except (TypeError, ValueError):
+        abort(400, "ids must be integers")
+    if not ids:
+        abort(400, "No ids given")
+    if not all(1 <= id <= MAX_ID for id in ids):
+        abort(400, f"ids must be between 1 and {MAX_ID}")
+    limit = current_app.config["API_BATCH_MAX_IDS"]
+    if len(ids) > limit:
+        abort(400, f"At most {limit} ids per request")
+    return ids
+
+
+def _batch(model, fields, fk_column):
+    ids = _batch_ids()
+    names = _fields(fields)
+    columns = [fields[name].label(name) for name in names]
+    if "id" not in names:
+        columns.append(model.id.label("id"))
+    if request.args.get("counts") in ("1", "true"):
+        names.append("num_upcoming_shows")
+    else:
+        fk_column = None
+
+    (rows,) = async_reads.fetch_all(
+        queries.batch_statement(model, ids, columns, fk_column)
+    )
+    found = {row.id: row._mapping for row in rows}
+    return _json(
+        {
+            "data": [_pick(found[id], names) for id in ids if id in found],
+            "missing": [id for id in ids if id not in found],
+        }
+    )
+
+
+def _search(search_page):
+    names = _fields(SEARCH_FIELDS)
+    result = search_page(
+        request.args.get("q", ""), page=_int_arg("page", 1), per_page=_per_page()
+    )
+    return _json(
+        {
+            "count": result["count"],
+            "data": [_pick(item, names) for item in result["data"]],
+            "page": result["page"],
+            "has_prev": result["has_prev"],
+            "has_next": result["has_next"],
+        }
+    )
+
+
+@api.route("/venues")
+@response_cache.cached("venues", args=("after", "limit", "fields"))
+def venues():
+    return _list(Venue, VENUE_FIELDS)
+
+
+@api.route("/venues/<int:venue_id>")
+@response_cache.cached("venue:{venue_id}", args=("fields",))
+def venue(venue_id):
+    return _detail(
+        Venue, VENUE_FIELDS, venue_id, queries.venue_shows_statement, "artist"
+    )
+
+
+@api.route("/venues/batch", methods=["GET", "POST"])
+def venue_batch():
+    return _batch(Venue, VENUE_FIELDS, Show.venue_id)
+
+
+@api.route("/artists")
+@response_cache.cached("artists", args=("after", "limit", "fields"))
+def artists():
+    return _list(Artist, ARTIST_FIELDS)
+
+
+@api.route("/artists/<int:artist_id>")
+@response_cache.cached("artist:{artist_id}", args=("fields",))
+def artist(artist_id):
+    return _detail(
+        Artist, ARTIST_FIELDS, artist_id, queries.artist_shows_statement, "venue"
+    )
+
+
+@api.route("/artists/batch", methods=["GET", "POST"])
+def artist_batch():
+    return _batch(Artist, ARTIST_FIELDS, Show.artist_id)
+
+
+@api.route("/shows")
+@response_cache.cached("shows", args=("after", "before", "limit", "fields"))
+def shows():
+    names = _fields(SHOW_FIELDS)
+    try:
+        page = queries.show_page(
+            after=request.args.get("after"),
+            before=request.args.get("before"),
+            per_page=_per_page(),
+        )
+    except ValueError:
+        abort(400, "Malformed cursor")
+    return _json(
+        {
+            "data": [_pick(show, names) for show in page["shows"]],
+            "prev_cursor": page["prev_cursor"],
+            "next_cursor": page["next_cursor"],
+        }
+    )
+
+
+@api.route("/search/venues")
+def search_venues():
+    return _search(queries.venue_search_page)
+
+
+@api.route("/search/artists")
+def search_artists():
+    return _search(queries.artist_search_page)
+
+
+@api.errorhandler(400)
+@api.errorhandler(404)
+def api_error(error):
+    return _json({"error": error.description}, error.code)
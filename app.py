@@ -2,135 +2,287 @@
 # Imports
 # ----------------------------------------------------------------------------#
 
-from email.policy import default
-import json
-from operator import or_
 import sys
-from time import sleep
-
-# from tkinter import ttk
-from unicodedata import name
-import dateutil.parser
-import babel
-from flask import Flask, render_template, request, Response, flash, redirect, url_for
+from functools import lru_cache
+from flask import (
+    Flask,
+    current_app,
+    render_template,
+    request,
+    Response,
+    stream_template,
+    flash,
+    redirect,
+    url_for,
+    abort,
+)
 from flask_moment import Moment
-from flask_sqlalchemy import SQLAlchemy
 import logging
 from logging import Formatter, FileHandler
-from flask_wtf import Form
-from sqlalchemy import desc
-from forms import *
-from flask_migrate import Migrate
-import config
-from models import db_setup, Venue, Show, Artist
+from config import get_config
+from matchmaking import (
+    artist_matches_statement,
+    clear_venue_matches,
+    refresh_artist_matches,
+    refresh_venue_matches,
+    venue_matches_statement,
+)
+from models import db, db_setup, GENRES, Venue, Show, Artist
+from api import api, dumps
+from assets import assets
+from async_reads import async_reads
+from cache import response_cache
+from commands import register_commands
+from profiler import init_profiler
+from queries import (
+    genre_facets,
+    iter_venue_areas,
+    iter_artists,
+    venue_search_page,
+    artist_search_page,
+    recent_statement,
+    detail_statement,
+    venue_shows_statement,
+    artist_shows_statement,
+    venue_past_shows,
+    artist_past_shows,
+    partition_shows,
+    show_page,
+    artist_ids_for_venue,
+    venue_ids_for_artist,
+)
+from template_cache import init_template_cache
 
 # ----------------------------------------------------------------------------#
 # App Config.
 # ----------------------------------------------------------------------------#
 
-app = Flask(__name__)
-moment = Moment(app)
-db = db_setup(app)
-# app.config.from_object("config")
-# db = SQLAlchemy(app)
-# migrate = Migrate(app, db)
 
-# TODO: connect to a local postgresql database
+def create_app(config_name=None):
+    """Build the app for ``config_name`` (default: $FYYUR_ENV).
+
+    Nothing here connects to the database: engines are created on first
+    use, i.e. in each worker after gunicorn forks. Forms and Babel are
+    imported by the views that need them.
+    """
+    app = Flask(__name__)
+    app.config.from_object(get_config(config_name))
+    Moment(app)
+    db_setup(app)
+    response_cache.init_app(app)
+    async_reads.init_app(app)
+    app.register_blueprint(api)
+    assets.init_app(app)
+    register_commands(app)
+    init_profiler(app)
+    init_template_cache(app)
+    app.jinja_env.filters["datetime"] = format_datetime
+    routes.register(app)
+
+    if not app.debug:
+        file_handler = FileHandler("error.log")
+        file_handler.setFormatter(
+            Formatter(
+                "%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]"
+            )
+        )
+        app.logger.setLevel(logging.INFO)
+        file_handler.setLevel(logging.INFO)
+        app.logger.addHandler(file_handler)
+        app.logger.info("errors")
+    return app
+
+
+class Routes:
+    """Collects the views below for create_app() to register on each app.
+
+    Unlike a Blueprint, it keeps the plain endpoint names ("venues",
+    "show_venue") that templates, READ_ONLY_ENDPOINTS and QUERY_BUDGETS use.
+    """
+
+    def __init__(self):
+        self.rules = []
+        self.error_handlers = []
+
+    def route(self, rule, **options):
+        def decorator(view):
+            endpoint = options.pop("endpoint", view.__name__)
+            self.rules.append((rule, endpoint, view, options))
+            return view
+
+        return decorator
+
+    def errorhandler(self, code):
+        def decorator(handler):
+            self.error_handlers.append((code, handler))
+            return handler
+
+        return decorator
+
+    def register(self, app):
+        for rule, endpoint, view, options in self.rules:
+            app.add_url_rule(rule, endpoint, view, **options)
+        for code, handler in self.error_handlers:
+            app.register_error_handler(code, handler)
+
+
+routes = Routes()
+
 
 # ----------------------------------------------------------------------------#
-# Models.
+# Filters.
 # ----------------------------------------------------------------------------#
 
 
-# class Venue(db.Model):
-#     __tablename__ = "venues"
+DATETIME_FORMATS = {
+    "full": "EEEE MMMM, d, y 'at' h:mma",
+    "medium": "EE MM, dd, y h:mma",
+}
 
-#     id = db.Column(db.Integer, primary_key=True)
-#     name = db.Column(db.String, nullable=False)
-#     city = db.Column(db.String(120), nullable=False)
-#     state = db.Column(db.String(120), nullable=False)
-#     address = db.Column(db.String(120), nullable=False)
-#     phone = db.Column(db.String(120), nullable=False)
-#     image_link = db.Column(db.String(500), default="")
-#     facebook_link = db.Column(db.String(120), default="")
 
-#     # TODO: implement any missing fields, as a database migration using Flask-Migrate
-#     genres = db.Column("genres", db.ARRAY(db.String()), nullable=False)
-#     website_link = db.Column(db.String(120), default="")
-#     looking_for_talent = db.Column(db.Boolean, default=False)
-#     seeking_description = db.Column(db.String(500), default="")
-#     shows = db.relationship("Show", backref="venue", lazy=True)
+@lru_cache(maxsize=None)
+def _datetime_pattern(format, locale):
+    # Babel re-parses the pattern string on every format_datetime() call;
+    # compile it once per (format, locale) instead. It is imported here so
+    # only a page that shows a date pays for it.
+    import babel.dates
 
-#     def __repr__(self):
-#         return f"<Venue {self.id} name: {self.name}>"
+    pattern = babel.dates.parse_pattern(DATETIME_FORMATS.get(format, format))
+    return pattern, babel.Locale.parse(locale)
 
 
-# class Artist(db.Model):
-#     __tablename__ = "artists"
+@lru_cache(maxsize=4096)
+def _format_datetime(value, format, locale):
+    pattern, babel_locale = _datetime_pattern(format, locale)
+    return pattern.apply(value, babel_locale)
 
-#     id = db.Column(db.Integer, primary_key=True)
-#     name = db.Column(db.String, nullable=False)
-#     city = db.Column(db.String(120), nullable=False)
-#     state = db.Column(db.String(120), nullable=False)
-#     phone = db.Column(db.String(120), nullable=False)
-#     genres = db.Column("genres", db.ARRAY(db.String()), nullable=False)
-#     image_link = db.Column(db.String(500), default="")
-#     facebook_link = db.Column(db.String(120), default="")
 
-#     # TODO: implement any missing fields, as a database migration using Flask-Migrate
-#     website_link = db.Column(db.String(120), default="")
-#     looking_for_venue = db.Column(db.Boolean, default=False)
-#     seeking_description = db.Column(db.String(500), default="")
+def format_datetime(value, format="medium", locale="en"):
+    if isinstance(value, str):
+        import dateutil.parser
 
-#     shows = db.relationship("Show", backref="artist", lazy=True)
+        value = dateutil.parser.parse(value)
+    return _format_datetime(value, format, locale)
 
-#     def __repr__(self):
-#         return f"<Artist {self.id} name: {self.name}>"
 
+# ----------------------------------------------------------------------------#
+# Streaming.
+# ----------------------------------------------------------------------------#
 
-# # TODO Implement Show and Artist models, and complete all model relationships and properties, as a database migration.
+STREAM_BUFFER_SIZE = 8192
 
 
-# class Show(db.Model):
-#     __tablename__ = "shows"
+def _buffered(pieces, first=1024, size=STREAM_BUFFER_SIZE):
+    # Jinja yields a piece per template node; send them in larger chunks,
+    # with a small first one so the page head goes out before any rows.
+    buffer, buffered, limit = [], 0, first
+    for piece in pieces:
+        buffer.append(piece)
+        buffered += len(piece)
+        if buffered >= limit:
+            yield "".join(buffer)
+            buffer, buffered, limit = [], 0, size
+    if buffer:
+        yield "".join(buffer)
 
-#     id = db.Column(db.Integer, primary_key=True)
-#     venue_id = db.Column(db.Integer, db.ForeignKey("venues.id"), nullable=False)
-#     artist_id = db.Column(db.Integer, db.ForeignKey("artists.id"), nullable=False)
-#     start_time = db.Column(db.DateTime, nullable=False)
 
-#     def __repr__(self):
-#         return f"<Show {self.id}, Artist {self.artist_id}, Venue {self.venue_id}>"
+def stream_page(template_name, **context):
+    """Render a template as a streamed response.
+
+    Pass iterators in ``context`` to fetch rows while the page is sent.
+    Under QUERY_BUDGET_STRICT the page is rendered in full instead, so its
+    queries are counted before the response is returned: it gets the
+    X-DB-* headers and can fail its budget.
+    """
+    if current_app.config["QUERY_BUDGET_STRICT"]:
+        return render_template(template_name, **context)
+    return Response(_buffered(stream_template(template_name, **context)))
 
 
 # ----------------------------------------------------------------------------#
-# Filters.
+# Genre filters.
+# ----------------------------------------------------------------------------#
+
+
+def _genre_args():
+    """The request's known ``genre`` filters, and how they combine."""
+    selected = request.args.getlist("genre")
+    genres = [genre for genre in GENRES if genre in selected]
+    match = "any" if request.args.get("match") == "any" else "all"
+    return genres, match
+
+
+def _genre_facets(model, tag, genres, match):
+    """A link per genre that toggles it, with its count under the filter.
+
+    Counts are cached until a write invalidates ``tag``.
+    """
+    counts = response_cache.cached_value(
+        f"genre_facets:{model.__tablename__}:{match}:{'|'.join(genres)}",
+        [tag],
+        lambda: genre_facets(model, genres, match),
+    )
+    facets = []
+    for genre in GENRES:
+        selected = genre in genres
+        toggled = [g for g in genres if g != genre] if selected else genres + [genre]
+        facets.append(
+            {
+                "genre": genre,
+                "count": counts.get(genre, 0),
+                "selected": selected,
+                "url": url_for(request.endpoint, genre=toggled, match=match),
+            }
+        )
+    return facets
+
+
+# ----------------------------------------------------------------------------#
+# Past shows.
 # ----------------------------------------------------------------------------#
 
 
-def format_datetime(value, format="medium"):
-    date = dateutil.parser.parse(value)
-    if format == "full":
-        format = "EEEE MMMM, d, y 'at' h:mma"
-    elif format == "medium":
-        format = "EE MM, dd, y h:mma"
-    return babel.dates.format_datetime(date, format, locale="en")
+def _past_shows_page(fetch, entity_id, prefix):
+    """The next page of past shows after ?after=, for "Load more".
 
+    An HTML fragment of show tiles (ending with the next "Load more"
+    button), or with ?format=json, the shows and the next page's cursor.
+    """
+    try:
+        shows, next_cursor = fetch(
+            entity_id,
+            after=request.args.get("after"),
+            per_page=current_app.config["PAST_SHOWS_PER_PAGE"],
+        )
+    except ValueError:
+        abort(400)
+    if request.args.get("format") == "json":
+        return current_app.response_class(
+            dumps({"data": shows, "next_cursor": next_cursor}),
+            mimetype="application/json",
+        )
+    next_url = None
+    if next_cursor is not None:
+        next_url = url_for(request.endpoint, after=next_cursor, **request.view_args)
+    return render_template(
+        "pages/past_shows.html", shows=shows, prefix=prefix, next_url=next_url
+    )
 
-app.jinja_env.filters["datetime"] = format_datetime
 
 # ----------------------------------------------------------------------------#
 # Controllers.
 # ----------------------------------------------------------------------------#
 
 
-@app.route("/")
+@routes.route("/")
+@response_cache.cached("venues", "artists")
 def index():
     recent_artists = []
     recent_venues = []
 
-    artists_data = Artist.query.order_by(desc(Artist.id)).limit(10).all()
-    venues_data = Venue.query.order_by(desc(Venue.id)).limit(10).all()
+    artists_data, venues_data = async_reads.fetch_all(
+        recent_statement(Artist), recent_statement(Venue)
+    )
     for artist in artists_data:
         recent_artists.append({"id": artist.id, "name": artist.name})
     for venue in venues_data:
@@ -144,54 +296,14 @@ def index():
 #  ----------------------------------------------------------------
 
 
-@app.route("/venues")
+@routes.route("/venues")
+@response_cache.cached("venues", args=("genre", "match"))
 def venues():
-    # TODO: replace with real venues data.
-    venues = Venue.query.all()
-    state_city_set = set()
-
-    res = []
-    for venue in venues:
-        state_city_set.add((venue.city, venue.state))
-
-    for each in state_city_set:
-        location_list = []
-
-        for venue in venues:
-            if venue.city == each[0] and venue.state == each[1]:
-                venue_shows = Show.query.filter_by(venue_id=venue.id).all()
-
-                location_list.append(
-                    {
-                        "id": venue.id,
-                        "name": venue.name,
-                        "num_upcoming_shows": len(futureShowsCheck(venue_shows)),
-                    }
-                )
-        res.append({"city": each[0], "state": each[1], "venues": location_list})
-
-        # venues = Venue.query.filter(
-        #     Venue.city == state_city_set[0], Venue.state == state_city_set[1]
-        # ).all()
-
-        # res_venues = []
-        # for venue in venues:
-        #     res_venues.append(
-        #         {
-        #             "id": venue.id,
-        #             "name": venue.name,
-        #             "num_upcoming_shows": len(futureShowsCheck(venue.shows)),
-        #         }
-        #     )
-
-        # res.append(
-        #     {
-        #         "city": state_city_set[0],
-        #         "state": state_city_set[1],
-        #         "venues": res_venues,
-        #     }
-        # )
-    #       num_upcoming_shows should be aggregated based on number of upcoming shows per venue.
+    genres, match = _genre_args()
+    facets = _genre_facets(Venue, "venues", genres, match)
+    res = iter_venue_areas(genres=genres, match=match)
+
+    # venue_areas() returns the same shape as the original mock data:
     # data = [
     #     {
     #         "city": "San Francisco",
@@ -221,26 +333,17 @@ def venues():
     #         ],
     #     },
     # ]
-    return render_template("pages/venues.html", areas=res)
+    return stream_page("pages/venues.html", areas=res, facets=facets)
 
 
-@app.route("/venues/search", methods=["POST"])
+@routes.route("/venues/search", methods=["POST"])
 def search_venues():
     # TODO: implement search on artists with partial string search. Ensure it is case-insensitive.
-    search_word = request.form["search_term"]
-    result = Venue.query.filter(Venue.name.ilike(f"%{search_word}%")).all()
-    data = []
-
-    for venue in result:
-        data.append(
-            {
-                "id": venue.id,
-                "name": venue.name,
-                "num_upcoming_shows": len(futureShowsCheck(venue.shows)),
-            }
-        )
-
-    response = {"count": len(result), "data": data}
+    response = venue_search_page(
+        request.form["search_term"],
+        page=request.form.get("page", 1, type=int),
+        per_page=current_app.config["SEARCH_RESULTS_PER_PAGE"],
+    )
     # seach for Hop should return "The Musical Hop".
     # search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee"
     # response = {
@@ -260,34 +363,21 @@ def search_venues():
     )
 
 
-@app.route("/venues/<int:venue_id>")
+@routes.route("/venues/<int:venue_id>")
+@response_cache.cached("venue:{venue_id}")
 def show_venue(venue_id):
     # shows the venue page with the given venue_id
     # TODO: replace with real venue data from the venues table, using venue_id
-    current_venue = Venue.query.get(venue_id)
-    shows = Show.query.filter_by(venue_id=venue_id).all()
-    previous_shows, next_shows = [], []
-    time = datetime.now()
-
-    for show in shows:
-        if show.start_time > time:
-            next_shows.append(
-                {
-                    "artist_id": show.artist_id,
-                    "artist_name": show.artist.name,
-                    "artist_image_link": show.artist.image_link,
-                    "start_time": str(show.start_time),
-                }
-            )
-        else:
-            previous_shows.append(
-                {
-                    "artist_id": show.artist_id,
-                    "artist_name": show.artist.name,
-                    "artist_image_link": show.artist.image_link,
-                    "start_time": str(show.start_time),
-                }
-            )
+    venue_rows, show_rows = async_reads.fetch_all(
+        detail_statement(Venue, venue_id),
+        venue_shows_statement(
+            venue_id, past_limit=current_app.config["PAST_SHOWS_PER_PAGE"]
+        ),
+    )
+    if not venue_rows:
+        abort(404)
+    current_venue = venue_rows[0]
+    shows = partition_shows(show_rows, "artist")
 
     data = {
         "id": current_venue.id,
@@ -302,10 +392,7 @@ def show_venue(venue_id):
         "seeking_talent": current_venue.looking_for_talent,
         "seeking_description": current_venue.seeking_description,
         "image_link": current_venue.image_link,
-        "past_shows": previous_shows,
-        "upcoming_shows": next_shows,
-        "past_shows_count": len(previous_shows),
-        "upcoming_shows_count": len(next_shows),
+        **shows,
     }
 
     # data1 = {
@@ -401,14 +488,45 @@ def show_venue(venue_id):
 #  ----------------------------------------------------------------
 
 
-@app.route("/venues/create", methods=["GET"])
+@routes.route("/venues/<int:venue_id>/past_shows")
+@response_cache.cached("venue:{venue_id}", args=("after", "format"))
+def show_venue_past_shows(venue_id):
+    return _past_shows_page(venue_past_shows, venue_id, "artist")
+
+
+@routes.route("/venues/<int:venue_id>/matches")
+@response_cache.cached("venue:{venue_id}", "venue_matches:{venue_id}", "matches")
+def venue_matches(venue_id):
+    venue_rows, match_rows = async_reads.fetch_all(
+        detail_statement(
+            Venue, venue_id, [Venue.id, Venue.name, Venue.looking_for_talent]
+        ),
+        venue_matches_statement(venue_id, current_app.config["MATCHES_PER_PAGE"]),
+    )
+    if not venue_rows:
+        abort(404)
+    venue = venue_rows[0]
+    return render_template(
+        "pages/matches.html",
+        entity={"id": venue.id, "name": venue.name, "url": f"/venues/{venue.id}"},
+        seeking=venue.looking_for_talent,
+        kind="artists",
+        matches=[dict(row._mapping) for row in match_rows],
+    )
+
+
+@routes.route("/venues/create", methods=["GET"])
 def create_venue_form():
+    from forms import VenueForm
+
     form = VenueForm()
     return render_template("forms/new_venue.html", form=form)
 
 
-@app.route("/venues/create", methods=["POST"])
+@routes.route("/venues/create", methods=["POST"])
 def create_venue_submission():
+    from forms import VenueForm
+
     # TODO: insert form data as a new Venue record in the db, instead
     # TODO: modify data to be the data object returned from db insertion
     form = VenueForm(request.form)
@@ -429,7 +547,15 @@ def create_venue_submission():
             )
 
             db.session.add(create_new_venue)
+            db.session.flush()
+            matched_artists = refresh_venue_matches(
+                create_new_venue.id, current_app.config["MATCHES_PER_PAGE"]
+            )
             db.session.commit()
+            response_cache.invalidate(
+                "venues",
+                *[f"artist_matches:{artist_id}" for artist_id in matched_artists],
+            )
             # on successful db insert, flash success
             flash("Venue " + form.name.data + " was successfully listed!")
         # TODO: on unsuccessful db insert, flash an error instead.
@@ -447,15 +573,26 @@ def create_venue_submission():
     return render_template("pages/home.html")
 
 
-@app.route("/venues/<venue_id>", methods=["DELETE"])
+@routes.route("/venues/<venue_id>", methods=["DELETE"])
 def delete_venue(venue_id):
     # TODO: Complete this endpoint for taking a venue_id, and using
     # SQLAlchemy ORM to delete a record. Handle cases where the session commit could fail.
     venue = Venue.query.get(venue_id)
     name_of_venue = venue.name
     try:
+        affected_artists = artist_ids_for_venue(venue_id)
+        matched_artists = clear_venue_matches(
+            venue_id, current_app.config["MATCHES_PER_PAGE"]
+        )
         db.session.delete(venue)
         db.session.commit()
+        response_cache.invalidate(
+            "venues",
+            "shows",
+            f"venue:{venue_id}",
+            *[f"artist:{artist_id}" for artist_id in affected_artists],
+            *[f"artist_matches:{artist_id}" for artist_id in matched_artists],
+        )
         flash("Venue " + name_of_venue + " was successflly deleted")
     except:
         # print(e)
@@ -472,14 +609,13 @@ def delete_venue(venue_id):
 
 #  Artists
 #  ----------------------------------------------------------------
-@app.route("/artists")
+@routes.route("/artists")
+@response_cache.cached("artists", args=("genre", "match"))
 def artists():
     # TODO: replace with real data returned from querying the database
-    artists_data = []
-    artists = Artist.query.all()
-
-    for artist in artists:
-        artists_data.append({"id": artist.id, "name": artist.name})
+    genres, match = _genre_args()
+    facets = _genre_facets(Artist, "artists", genres, match)
+    artists_data = iter_artists(genres, match)
 
     # data = [
     #     {
@@ -495,31 +631,19 @@ def artists():
     #         "name": "The Wild Sax Band",
     #     },
     # ]
-    return render_template("pages/artists.html", artists=artists_data)
+    return stream_page("pages/artists.html", artists=artists_data, facets=facets)
 
 
-@app.route("/artists/search", methods=["POST"])
+@routes.route("/artists/search", methods=["POST"])
 def search_artists():
     # TODO: implement search on artists with partial string search. Ensure it is case-insensitive.
     # seach for "A" should return "Guns N Petals", "Matt Quevado", and "The Wild Sax Band".
     # search for "band" should return "The Wild Sax Band".
-    search_word = request.form["search_term"]
-    result = Artist.query.filter((Artist.name.ilike(f"%{search_word}%"))).all()
-    data = []
-
-    for artist in result:
-        data.append(
-            {
-                "id": artist.id,
-                "name": artist.name,
-                "num_upcoming_shows": len(futureShowsCheck(artist.shows)),
-            }
-        )
-
-    response = {
-        "count": len(result),
-        "data": data,
-    }
+    response = artist_search_page(
+        request.form["search_term"],
+        page=request.form.get("page", 1, type=int),
+        per_page=current_app.config["SEARCH_RESULTS_PER_PAGE"],
+    )
 
     # response = {
     #     "count": 1,
@@ -538,34 +662,21 @@ def search_artists():
     )
 
 
-@app.route("/artists/<int:artist_id>")
+@routes.route("/artists/<int:artist_id>")
+@response_cache.cached("artist:{artist_id}")
 def show_artist(artist_id):
     # shows the artist page with the given artist_id
     # TODO: replace with real artist data from the artist table, using artist_id
-    current_artist = Artist.query.get(artist_id)
-    shows = Show.query.filter_by(artist_id=artist_id).all()
-    previous_shows, next_shows = [], []
-    current_time = datetime.now()
-
-    for show in shows:
-        if show.start_time > current_time:
-            next_shows.append(
-                {
-                    "venue_id": show.venue_id,
-                    "venue_name": show.venue.name,
-                    "venue_image_link": show.venue.image_link,
-                    "start_time": str(show.start_time),
-                }
-            )
-        else:
-            previous_shows.append(
-                {
-                    "venue_id": show.venue_id,
-                    "venue_name": show.venue.name,
-                    "venue_image_link": show.venue.image_link,
-                    "start_time": str(show.start_time),
-                }
-            )
+    artist_rows, show_rows = async_reads.fetch_all(
+        detail_statement(Artist, artist_id),
+        artist_shows_statement(
+            artist_id, past_limit=current_app.config["PAST_SHOWS_PER_PAGE"]
+        ),
+    )
+    if not artist_rows:
+        abort(404)
+    current_artist = artist_rows[0]
+    shows = partition_shows(show_rows, "venue")
 
     data = {
         "id": current_artist.id,
@@ -580,10 +691,7 @@ def show_artist(artist_id):
         "seeking_talent": current_artist.looking_for_venue,
         "seeking_description": current_artist.seeking_description,
         "image_link": current_artist.image_link,
-        "past_shows": previous_shows,
-        "upcoming_shows": next_shows,
-        "past_shows_count": len(previous_shows),
-        "upcoming_shows_count": len(next_shows),
+        **shows,
     }
     # data1 = {
     #     "id": 4,
@@ -668,10 +776,38 @@ def show_artist(artist_id):
     return render_template("pages/show_artist.html", artist=data)
 
 
+@routes.route("/artists/<int:artist_id>/past_shows")
+@response_cache.cached("artist:{artist_id}", args=("after", "format"))
+def show_artist_past_shows(artist_id):
+    return _past_shows_page(artist_past_shows, artist_id, "venue")
+
+
+@routes.route("/artists/<int:artist_id>/matches")
+@response_cache.cached("artist:{artist_id}", "artist_matches:{artist_id}", "matches")
+def artist_matches(artist_id):
+    artist_rows, match_rows = async_reads.fetch_all(
+        detail_statement(
+            Artist, artist_id, [Artist.id, Artist.name, Artist.looking_for_venue]
+        ),
+        artist_matches_statement(artist_id, current_app.config["MATCHES_PER_PAGE"]),
+    )
+    if not artist_rows:
+        abort(404)
+    artist = artist_rows[0]
+    return render_template(
+        "pages/matches.html",
+        entity={"id": artist.id, "name": artist.name, "url": f"/artists/{artist.id}"},
+        seeking=artist.looking_for_venue,
+        kind="venues",
+        matches=[dict(row._mapping) for row in match_rows],
+    )
+
+
 #  Update
 #  ----------------------------------------------------------------
-@app.route("/artists/<int:artist_id>/edit", methods=["GET"])
+@routes.route("/artists/<int:artist_id>/edit", methods=["GET"])
 def edit_artist(artist_id):
+    from forms import ArtistForm
 
     artist = Artist.query.get(artist_id)
     form = ArtistForm(obj=artist)
@@ -707,8 +843,10 @@ def edit_artist(artist_id):
     return render_template("forms/edit_artist.html", form=form, artist=artist)
 
 
-@app.route("/artists/<int:artist_id>/edit", methods=["POST"])
+@routes.route("/artists/<int:artist_id>/edit", methods=["POST"])
 def edit_artist_submission(artist_id):
+    from forms import ArtistForm
+
     # TODO: take values from the form submitted, and update existing
     # artist record with ID <artist_id> using the new attributes
     form = ArtistForm(request.form)
@@ -726,7 +864,18 @@ def edit_artist_submission(artist_id):
             artist.looking_for_venue = form.seeking_venue.data
             artist.seeking_description = form.seeking_description.data
 
+            affected_venues = venue_ids_for_artist(artist_id)
+            matched_venues = refresh_artist_matches(
+                artist_id, current_app.config["MATCHES_PER_PAGE"]
+            )
             db.session.commit()
+            response_cache.invalidate(
+                "artists",
+                "shows",
+                f"artist:{artist_id}",
+                *[f"venue:{venue_id}" for venue_id in affected_venues],
+                *[f"venue_matches:{venue_id}" for venue_id in matched_venues],
+            )
             flash(
                 "The Artist " + request.form["name"] + " has been successfully updated!"
             )
@@ -741,8 +890,9 @@ def edit_artist_submission(artist_id):
     return redirect(url_for("show_artist", artist_id=artist_id))
 
 
-@app.route("/venues/<int:venue_id>/edit", methods=["GET"])
+@routes.route("/venues/<int:venue_id>/edit", methods=["GET"])
 def edit_venue(venue_id):
+    from forms import VenueForm
 
     new_venue = Venue.query.get(venue_id)
     form = VenueForm(obj=new_venue)
@@ -779,8 +929,10 @@ def edit_venue(venue_id):
     return render_template("forms/edit_venue.html", form=form, venue=venue)
 
 
-@app.route("/venues/<int:venue_id>/edit", methods=["POST"])
+@routes.route("/venues/<int:venue_id>/edit", methods=["POST"])
 def edit_venue_submission(venue_id):
+    from forms import VenueForm
+
     # TODO: take values from the form submitted, and update existing
     # venue record with ID <venue_id> using the new attributes
     try:
@@ -799,7 +951,18 @@ def edit_venue_submission(venue_id):
         venue.looking_for_talent = form.seeking_talent.data
         venue.seeking_description = form.seeking_description.data
 
+        affected_artists = artist_ids_for_venue(venue_id)
+        matched_artists = refresh_venue_matches(
+            venue_id, current_app.config["MATCHES_PER_PAGE"]
+        )
         db.session.commit()
+        response_cache.invalidate(
+            "venues",
+            "shows",
+            f"venue:{venue_id}",
+            *[f"artist:{artist_id}" for artist_id in affected_artists],
+            *[f"artist_matches:{artist_id}" for artist_id in matched_artists],
+        )
         flash("Venue " + request.form["name"] + "has been updated")
     except:
         db.session.rollback()
@@ -815,14 +978,18 @@ def edit_venue_submission(venue_id):
 #  ----------------------------------------------------------------
 
 
-@app.route("/artists/create", methods=["GET"])
+@routes.route("/artists/create", methods=["GET"])
 def create_artist_form():
+    from forms import ArtistForm
+
     form = ArtistForm()
     return render_template("forms/new_artist.html", form=form)
 
 
-@app.route("/artists/create", methods=["POST"])
+@routes.route("/artists/create", methods=["POST"])
 def create_artist_submission():
+    from forms import ArtistForm
+
     # called upon submitting the new artist listing form
     # TODO: insert form data as a new Venue record in the db, instead
     # TODO: modify data to be the data object returned from db insertion
@@ -843,7 +1010,15 @@ def create_artist_submission():
             )
 
             db.session.add(new_artist)
+            db.session.flush()
+            matched_venues = refresh_artist_matches(
+                new_artist.id, current_app.config["MATCHES_PER_PAGE"]
+            )
             db.session.commit()
+            response_cache.invalidate(
+                "artists",
+                *[f"venue_matches:{venue_id}" for venue_id in matched_venues],
+            )
             flash("Artist " + form.name.data + " was successfully listed!")
         except:
             db.session.rollback()
@@ -864,24 +1039,19 @@ def create_artist_submission():
 #  ----------------------------------------------------------------
 
 
-@app.route("/shows")
+@routes.route("/shows")
+@response_cache.cached("shows", args=("after", "before"))
 def shows():
     # displays list of shows at /shows
     # TODO: replace with real venues data.
-    allshows = []
-    shows_data = Show.query.order_by(db.desc(Show.start_time))
-
-    for show in shows_data:
-        allshows.append(
-            {
-                "venue_id": show.venue.id,
-                "venue_name": show.venue.name,
-                "artist_id": show.artist_id,
-                "artist_name": show.artist.name,
-                "artist_image_link": show.artist.image_link,
-                "start_time": format_datetime(str(show.start_time)),
-            }
+    try:
+        page = show_page(
+            after=request.args.get("after"),
+            before=request.args.get("before"),
+            per_page=current_app.config["SHOWS_PER_PAGE"],
         )
+    except ValueError:
+        abort(400)
 
     # data = [
     #     {
@@ -925,17 +1095,24 @@ def shows():
     #         "start_time": "2035-04-15T20:00:00.000Z",
     #     },
     # ]
-    return render_template("pages/shows.html", shows=allshows)
+    return stream_page(
+        "pages/shows.html",
+        shows=page["shows"],
+        prev_cursor=page["prev_cursor"],
+        next_cursor=page["next_cursor"],
+    )
 
 
-@app.route("/shows/create")
+@routes.route("/shows/create")
 def create_shows():
+    from forms import ShowForm
+
     # renders form. do not touch.
     form = ShowForm()
     return render_template("forms/new_show.html", form=form)
 
 
-@app.route("/shows/create", methods=["POST"])
+@routes.route("/shows/create", methods=["POST"])
 def create_show_submission():
     # called to create new shows in the db, upon submitting new show listing form
     # TODO: insert form data as a new Show record in the db, instead
@@ -947,6 +1124,9 @@ def create_show_submission():
         )
         db.session.add(show)
         db.session.commit()
+        response_cache.invalidate(
+            "shows", "venues", f"venue:{show.venue_id}", f"artist:{show.artist_id}"
+        )
         flash("Show was successfully listed!")
     except:
         db.session.rollback()
@@ -962,55 +1142,24 @@ def create_show_submission():
     return render_template("pages/home.html")
 
 
-@app.errorhandler(404)
+@routes.errorhandler(404)
 def not_found_error(error):
     return render_template("errors/404.html"), 404
 
 
-@app.errorhandler(500)
+@routes.errorhandler(500)
 def server_error(error):
     return render_template("errors/500.html"), 500
 
 
-if not app.debug:
-    file_handler = FileHandler("error.log")
-    file_handler.setFormatter(
-        Formatter("%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]")
-    )
-    app.logger.setLevel(logging.INFO)
-    file_handler.setLevel(logging.INFO)
-    app.logger.addHandler(file_handler)
-    app.logger.info("errors")
-
-
-# ----------------------------------------------------------------------------#
-# Utils
-# ----------------------------------------------------------------------------#
-def futureShowsCheck(shows):
-    future_shows = []
-    current_date = datetime.now()
-    for show in shows:
-        if show.start_time > current_date:
-            future_shows.append(show)
-    return future_shows
-
-
-def pastShowsCheck(shows):
-    past_shows = []
-    current_date = datetime.now()
-    for show in shows:
-        if show.start_time <= current_date:
-            past_shows.append(show)
-    return past_shows
-
-
 # ----------------------------------------------------------------------------#
 # Launch.
 # ----------------------------------------------------------------------------#
 
+# Development server only; production runs under gunicorn through wsgi.py.
 # Default port:
 if __name__ == "__main__":
-    app.run()
+    create_app().run()
 
 # Or specify port manually:
 """
@@ -0,0 +1,231 @@
+import gzip
+import hashlib
+import json
+import os
+import posixpath
+import re
+
+from flask import current_app, request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+# Bundles built into static/dist, in the order their sources are loaded.
+# head.js is loaded synchronously in <head>; defer.js after the page
+# (and the jQuery it needs) has been parsed.
+BUNDLES = {
+    "site.css": [
+        "css/bootstrap.min.css",
+        "css/layout.main.css",
+        "css/main.css",
+        "css/main.responsive.css",
+        "css/main.quickfix.css",
+    ],
+    "head.js": [
+        "js/libs/modernizr-2.8.2.min.js",
+        "js/libs/moment.min.js",
+    ],
+    "defer.js": [
+        "js/script.js",
+        "js/libs/bootstrap-3.1.1.min.js",
+        "js/plugins.js",
+    ],
+}
+DIST_DIR = "dist"
+MANIFEST = "manifest.json"
+
+# Strings, comments, punctuation with the whitespace around it, and other
+# whitespace: matched in one pass so nothing inside a string is touched.
+_CSS_TOKEN = re.compile(
+    r"""("(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')|(/\*.*?\*/)|\s*([{};,>])\s*|(\s+)""",
+    re.S,
+)
+_CSS_URL = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+# url()s that do not depend on where the stylesheet is served from.
+_ABSOLUTE_URL = re.compile(r"^(?:[a-z][a-z0-9+.-]*:|/|#)", re.I)
+_URL_SUFFIX = re.compile(r"([^?#]*)(.*)")
+
+
+def _css_token(match):
+    string, comment, punctuation, space = match.groups()
+    if string is not None:
+        return string
+    if comment is not None:
+        return ""
+    if punctuation is not None:
+        return punctuation
+    return " "
+
+
+def minify_css(source):
+    if rcssmin is not None:
+        return rcssmin.cssmin(source)
+    return _CSS_TOKEN.sub(_css_token, source).strip()
+
+
+def minify_js(source):
+    # Without rjsmin the (mostly pre-minified) sources are only joined:
+    # telling a regex literal from a division takes a real parser.
+    if rjsmin is not None:
+        return rjsmin.jsmin(source)
+    return source
+
+
+def rebase_css_urls(source, base_url):
+    """Make the relative url()s of a stylesheet at ``base_url`` absolute.
+
+    Bundles are served from /assets/, not from their sources' directories,
+    so "../fonts/x.woff" in static/css/ must become "/static/fonts/x.woff".
+    """
+
+    def rebase(match):
+        quote, url = match.group(1), match.group(2).strip()
+        if _ABSOLUTE_URL.match(url):
+            return match.group(0)
+        path, suffix = _URL_SUFFIX.match(url).groups()
+        url = posixpath.normpath(posixpath.join(base_url, path)) + suffix
+        return f"url({quote}{url}{quote})"
+
+    return _CSS_URL.sub(rebase, source)
+
+
+def _bundle(static_folder, static_url_path, name, sources):
+    contents = []
+    for source in sources:
+        with open(os.path.join(static_folder, source), encoding="utf-8") as f:
+            contents.append(f.read())
+    if name.endswith(".css"):
+        return "\n".join(
+            minify_css(
+                rebase_css_urls(
+                    content,
+                    posixpath.join(static_url_path, posixpath.dirname(source)),
+                )
+            )
+            for content, source in zip(contents, sources)
+        )
+    # A newline and semicolon keep a file without a trailing one from
+    # running into the next.
+    return "\n;".join(minify_js(content) for content in contents)
+
+
+def build(static_folder, static_url_path="/static"):
+    """Write the content-hashed, precompressed bundles and their manifest.
+
+    ``static_url_path`` is where ``static_folder`` is served, for the
+    url()s in stylesheets. Returns the manifest: bundle name -> file name
+    in static/dist.
+    """
+    dist = os.path.join(static_folder, DIST_DIR)
+    os.makedirs(dist, exist_ok=True)
+    manifest = {}
+    for name, sources in BUNDLES.items():
+        data = _bundle(static_folder, static_url_path, name, sources).encode("utf-8")
+        stem, ext = os.path.splitext(name)
+        filename = f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+        path = os.path.join(dist, filename)
+        with open(path, "wb") as f:
+            f.write(data)
+        with open(path + ".gz", "wb") as f:
+            f.write(gzip.compress(data, 9, mtime=0))
+        if brotli is not None:
+            with open(path + ".br", "wb") as f:
+                f.write(brotli.compress(data))
+        manifest[name] = filename
+
+    # Bundles from earlier builds are kept so pages cached by clients can
+    # still load them.
+    tmp = os.path.join(dist, MANIFEST + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, os.path.join(dist, MANIFEST))
+    return manifest
+
+
+class _AppAssets:
+    """One app's bundle manifest, read on first use."""
+
+    def __init__(self):
+        self.manifest = None
+
+
+class Assets:
+    """Serves the built bundles and the ``asset_urls()`` template helper.
+
+    Without a build (e.g. in development), ``asset_urls()`` lists the
+    bundle's source files so pages still work. Each app's manifest is kept
+    in ``app.extensions``.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions["assets"] = _AppAssets()
+        app.add_url_rule("/assets/<path:filename>", "assets", self._serve)
+        app.add_template_global(self.asset_urls)
+
+    def manifest(self):
+        state = current_app.extensions["assets"]
+        if state.manifest is None or current_app.debug:
+            path = os.path.join(current_app.static_folder, DIST_DIR, MANIFEST)
+            try:
+                with open(path) as f:
+                    state.manifest = json.load(f)
+            except FileNotFoundError:
+                state.manifest = {}
+        return state.manifest
+
+    def asset_urls(self, name):
+        filename = self.manifest().get(name)
+        if filename is not None:
+            return [url_for("assets", filename=filename)]
+        return [url_for("static", filename=source) for source in BUNDLES[name]]
+
+    def _serve(self, filename):
+        dist = os.path.join(current_app.static_folder, DIST_DIR)
+        encoding = None
+        for candidate, suffix in (("br", ".br"), ("gzip", ".gz")):
+            if request.accept_encodings[candidate] and os.path.isfile(
+                os.path.join(dist, filename + suffix)
+            ):
+                encoding = candidate
+                break
+
+        if encoding is None:
+            response = send_from_directory(dist, filename)
+        else:
+            response = send_from_directory(
+                dist,
+                filename + (".br" if encoding == "br" else ".gz"),
+                mimetype=_mimetype(filename),
+            )
+            response.headers["Content-Encoding"] = encoding
+        # The name changes with the content, so it never needs revalidating.
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        response.headers["Vary"] = "Accept-Encoding"
+        return response
+
+
+def _mimetype(filename):
+    if filename.endswith(".css"):
+        return "text/css"
+    if filename.endswith(".js"):
+        return "application/javascript"
+    return None
+
+
+assets = Assets()
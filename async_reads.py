@@ -0,0 +1,117 @@
+import asyncio
+import concurrent.futures
+import os
+import threading
+
+from flask import current_app, g
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from models import db
+
+_POOL_OPTIONS = (
+    "pool_size",
+    "max_overflow",
+    "pool_timeout",
+    "pool_recycle",
+    "pool_pre_ping",
+)
+
+
+class _Reader:
+    """One app's async reads: its settings, event loop and engines."""
+
+    def __init__(self, enabled, timeout, engine_options):
+        self.enabled = enabled
+        self.timeout = timeout
+        self.engine_options = engine_options
+        self._loop = None
+        self._pid = None
+        self._engines = {}
+        self._lock = threading.Lock()
+
+    def event_loop(self):
+        # The loop thread and its connections do not survive a fork, so a
+        # worker starts its own on first use.
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=loop.run_forever, name="async-reads", daemon=True
+                ).start()
+                self._loop, self._pid, self._engines = loop, os.getpid(), {}
+            return self._loop
+
+    def _engine(self, url):
+        # Only called on the loop thread.
+        key = url.render_as_string(hide_password=False)
+        engine = self._engines.get(key)
+        if engine is None:
+            engine = create_async_engine(
+                url.set(drivername="postgresql+asyncpg"), **self.engine_options
+            )
+            self._engines[key] = engine
+        return engine
+
+    async def _fetch(self, engine, statement):
+        async with engine.connect() as conn:
+            result = await conn.execute(statement)
+            return result.all()
+
+    async def gather(self, url, statements):
+        engine = self._engine(url)
+        return await asyncio.gather(
+            *(self._fetch(engine, statement) for statement in statements)
+        )
+
+
+class AsyncReads:
+    """Runs the independent read statements of a request concurrently.
+
+    With ASYNC_READS on, each worker process runs one event loop thread with
+    an asyncpg engine per database. Request threads hand their statements to
+    the loop and wait for the rows, so the statements of one request overlap
+    and a worker can keep many slow reads in flight on one pool. With it off,
+    the statements run one after the other on the request's session.
+
+    Writes always go through the regular session. Each app's settings and
+    loop are kept in ``app.extensions``.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        options = app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {})
+        engine_options = {
+            key: value for key, value in options.items() if key in _POOL_OPTIONS
+        }
+        server_settings = app.config.get("ASYNC_READS_SERVER_SETTINGS")
+        if server_settings:
+            engine_options["connect_args"] = {"server_settings": server_settings}
+        app.extensions["async_reads"] = _Reader(
+            app.config.get("ASYNC_READS", False),
+            app.config.get("ASYNC_READS_TIMEOUT", 30),
+            engine_options,
+        )
+
+    def fetch_all(self, *statements):
+        """The rows of each of ``statements``, in order."""
+        reader = current_app.extensions["async_reads"]
+        if not reader.enabled:
+            return [db.session.execute(statement).all() for statement in statements]
+
+        # The loop runs each request's statements in a copy of the request's
+        # context, so the query instrumentation still counts them.
+        bind = g.get("db_replica") or db.engine
+        future = asyncio.run_coroutine_threadsafe(
+            reader.gather(bind.url, statements), reader.event_loop()
+        )
+        try:
+            return future.result(reader.timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+
+async_reads = AsyncReads()
@@ -0,0 +1,69 @@
+"""Micro-benchmark for the ``datetime`` Jinja filter.
+
+Compares the original string round-trip (``str`` -> dateutil -> Babel, with
+the pattern re-parsed on each call) against ``app.format_datetime`` on
+datetime objects, cold (unique values) and warm (repeated values, as when a
+page lists many shows at the same time slots).
+
+    python -m benchmarks.format_datetime [--rows 2000] [--repeat 5]
+"""
+
+import argparse
+import timeit
+from datetime import datetime, timedelta
+
+import babel.dates
+import dateutil.parser
+
+from app import format_datetime, _format_datetime
+
+
+def original_format_datetime(value, format="medium"):
+    date = dateutil.parser.parse(value)
+    if format == "full":
+        format = "EEEE MMMM, d, y 'at' h:mma"
+    elif format == "medium":
+        format = "EE MM, dd, y h:mma"
+    return babel.dates.format_datetime(date, format, locale="en")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    start = datetime(2022, 1, 1, 20, 0)
+    values = [start + timedelta(minutes=37 * i) for i in range(args.rows)]
+    slots = [start + timedelta(days=i % 50) for i in range(args.rows)]
+
+    for value in values[:50]:
+        assert format_datetime(value, "full") == original_format_datetime(
+            str(value), "full"
+        )
+
+    def run_original():
+        for value in values:
+            original_format_datetime(str(value), "full")
+
+    def run_cold():
+        _format_datetime.cache_clear()
+        for value in values:
+            format_datetime(value, "full")
+
+    def run_warm():
+        for value in slots:
+            format_datetime(value, "full")
+
+    print(f"per-row cost over {args.rows} rows (best of {args.repeat}):")
+    for label, fn in [
+        ("original (str round-trip)", run_original),
+        ("datetime, cold cache", run_cold),
+        ("datetime, warm cache", run_warm),
+    ]:
+        best = min(timeit.repeat(fn, number=1, repeat=args.repeat))
+        print(f"  {label:28} {best / args.rows * 1e6:8.2f} us")
+
+
+if __name__ == "__main__":
+    main()
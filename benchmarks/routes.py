@@ -0,0 +1,233 @@
+"""Measure latency and query count of every read route through the test client.
+
+Run against a database seeded with ``python -m benchmarks.seed --matches``:
+
+    python -m benchmarks.routes [--repeat 20] [--output bench.json]
+                                [--baseline benchmarks/baseline.json]
+                                [--save-baseline]
+
+The app runs with BenchmarkConfig: production settings, with the response
+cache disabled so every request reaches the database. Each route is
+requested --repeat times after one warm-up request; its query count comes
+from the request instrumentation, which reports streamed pages once their
+body has been sent. Results are
+written as JSON; with --baseline, a route fails when its median latency
+grows past --max-slowdown times the baseline or it runs more queries than
+the baseline did, and the command exits non-zero.
+
+The form submissions and delete handler are left out because they would
+change the dataset being measured.
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+
+from sqlalchemy import func
+
+DEFAULT_BASELINE = "benchmarks/baseline.json"
+
+
+def _busiest(db, column):
+    from models import Show
+
+    return (
+        db.session.query(column)
+        .group_by(column)
+        .order_by(func.count(Show.id).desc())
+        .limit(1)
+        .scalar()
+    )
+
+
+def build_routes(db, app):
+    """(name, method, path, form data) for every read route."""
+    from models import Show
+    from queries import (
+        artist_shows_statement,
+        partition_shows,
+        show_page,
+        venue_shows_statement,
+    )
+
+    venue_id = _busiest(db, Show.venue_id) or 1
+    artist_id = _busiest(db, Show.artist_id) or 1
+    first_page = show_page(per_page=app.config["SHOWS_PER_PAGE"])
+    past_limit = app.config["PAST_SHOWS_PER_PAGE"]
+    # The cursor the "Load more" button of each detail page requests.
+    venue_cursor = partition_shows(
+        db.session.execute(venue_shows_statement(venue_id, past_limit=past_limit)),
+        "artist",
+    )["past_shows_next_cursor"]
+    artist_cursor = partition_shows(
+        db.session.execute(artist_shows_statement(artist_id, past_limit=past_limit)),
+        "venue",
+    )["past_shows_next_cursor"]
+    return [
+        ("index", "GET", "/", None),
+        ("venues", "GET", "/venues", None),
+        ("artists", "GET", "/artists", None),
+        ("shows", "GET", "/shows", None),
+        (
+            "shows (page 2)",
+            "GET",
+            f"/shows?after={first_page['next_cursor']}",
+            None,
+        ),
+        ("show_venue", "GET", f"/venues/{venue_id}", None),
+        ("show_artist", "GET", f"/artists/{artist_id}", None),
+        (
+            "show_venue_past_shows",
+            "GET",
+            f"/venues/{venue_id}/past_shows?after={venue_cursor or ''}",
+            None,
+        ),
+        (
+            "show_artist_past_shows",
+            "GET",
+            f"/artists/{artist_id}/past_shows?after={artist_cursor or ''}",
+            None,
+        ),
+        ("venue_matches", "GET", f"/venues/{venue_id}/matches", None),
+        ("artist_matches", "GET", f"/artists/{artist_id}/matches", None),
+        ("search_venues", "POST", "/venues/search", {"search_term": "hall"}),
+        ("search_artists", "POST", "/artists/search", {"search_term": "band"}),
+        ("create_venue_form", "GET", "/venues/create", None),
+        ("create_artist_form", "GET", "/artists/create", None),
+        ("create_shows", "GET", "/shows/create", None),
+        ("edit_venue", "GET", f"/venues/{venue_id}/edit", None),
+        ("edit_artist", "GET", f"/artists/{artist_id}/edit", None),
+        ("api.venues", "GET", "/api/v1/venues", None),
+        ("api.venue", "GET", f"/api/v1/venues/{venue_id}", None),
+        ("api.artists", "GET", "/api/v1/artists", None),
+        ("api.artist", "GET", f"/api/v1/artists/{artist_id}", None),
+        ("api.shows", "GET", "/api/v1/shows", None),
+        (
+            "api.venue_batch",
+            "GET",
+            f"/api/v1/venues/batch?ids={','.join(map(str, range(1, 101)))}",
+            None,
+        ),
+        (
+            "api.artist_batch",
+            "GET",
+            f"/api/v1/artists/batch?ids={','.join(map(str, range(1, 101)))}",
+            None,
+        ),
+        ("api.search_venues", "GET", "/api/v1/search/venues?q=hall", None),
+        ("api.search_artists", "GET", "/api/v1/search/artists?q=band", None),
+    ]
+
+
+def measure(client, method, path, data, repeat):
+    from instrumentation import query_stats_reported
+
+    timings = []
+    queries = None
+    reported = []
+
+    def record(sender, endpoint, stats):
+        reported.append(stats.count)
+
+    for i in range(repeat + 1):
+        reported.clear()
+        with query_stats_reported.connected_to(record):
+            started = time.perf_counter()
+            # Closing the response ends a streamed page, which reports its
+            # queries.
+            with client.open(path, method=method, data=data) as response:
+                response.get_data()
+            elapsed = (time.perf_counter() - started) * 1000
+        if response.status_code != 200:
+            raise RuntimeError(f"{method} {path} returned {response.status_code}")
+        if len(reported) != 1:
+            raise RuntimeError(f"{method} {path} reported no query count")
+        if i == 0:
+            continue
+        timings.append(elapsed)
+        queries = reported[0]
+    timings.sort()
+    return {
+        "method": method,
+        "path": path,
+        "median_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(timings[max(0, int(len(timings) * 0.95) - 1)], 3),
+        "queries": queries,
+    }
+
+
+def compare(results, baseline, max_slowdown):
+    failures = []
+    for name, result in results.items():
+        before = baseline.get("routes", {}).get(name)
+        if before is None:
+            continue
+        if result["median_ms"] > before["median_ms"] * max_slowdown:
+            failures.append(
+                f"{name}: median {result['median_ms']:.1f} ms, "
+                f"baseline {before['median_ms']:.1f} ms"
+            )
+        if result["queries"] > before["queries"]:
+            failures.append(
+                f"{name}: {result['queries']} queries, baseline {before['queries']}"
+            )
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="compare against this results file")
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help=f"write results to {DEFAULT_BASELINE}",
+    )
+    parser.add_argument("--max-slowdown", type=float, default=1.25)
+    args = parser.parse_args(argv)
+
+    from app import create_app
+    from models import db
+
+    app = create_app("benchmark")
+
+    with app.app_context():
+        routes = build_routes(db, app)
+        db.session.remove()
+
+    client = app.test_client()
+    results = {}
+    for name, method, path, data in routes:
+        results[name] = measure(client, method, path, data, args.repeat)
+        r = results[name]
+        print(
+            f"{name:24} {r['median_ms']:9.2f} ms median {r['p95_ms']:9.2f} ms p95 "
+            f"{r['queries']:4d} queries"
+        )
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "repeat": args.repeat,
+        "routes": results,
+    }
+    for path in filter(None, [args.output, args.save_baseline and DEFAULT_BASELINE]):
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            failures = compare(results, json.load(f), args.max_slowdown)
+        for failure in failures:
+            print("REGRESSION " + failure)
+        if failures:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""Seed the configured database with a deterministic synthetic dataset.
+
+The same --seed and --anchor always produce the same rows. Show times are
+spread around the anchor date (midnight today by default) so roughly a
+tenth of them are upcoming, as on a long-running site.
+
+    python -m benchmarks.seed --reset [--venues 50000] [--artists 50000]
+                              [--shows 1000000] [--seed 1] [--anchor 2022-09-01]
+                              [--matches]
+
+Rows are written with COPY in batches; --reset truncates venues, artists,
+shows and matches first. Afterwards the shows are moved into monthly
+partitions and, with --matches, the matches are built.
+"""
+
+import argparse
+import csv
+import io
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+STATES = ["CA", "NY", "TX", "WA", "IL", "FL", "MA", "CO", "GA", "OR", "TN", "LA"]
+GENRES = [
+    "Alternative",
+    "Blues",
+    "Classical",
+    "Country",
+    "Electronic",
+    "Folk",
+    "Funk",
+    "Hip-Hop",
+    "Heavy Metal",
+    "Instrumental",
+    "Jazz",
+    "Musical Theatre",
+    "Pop",
+    "Punk",
+    "R&B",
+    "Reggae",
+    "Rock n Roll",
+    "Soul",
+    "Other",
+]
+WORDS = [
+    "Velvet",
+    "Echo",
+    "Neon",
+    "Harbor",
+    "Lantern",
+    "Copper",
+    "Midnight",
+    "Golden",
+    "Static",
+    "Wild",
+    "Blue",
+    "Paper",
+    "Silver",
+    "Canyon",
+    "Electric",
+    "Rusty",
+]
+VENUE_KINDS = ["Hall", "Room", "Lounge", "Theatre", "Club", "Stage", "Bar", "Garden"]
+ARTIST_KINDS = ["Band", "Trio", "Collective", "Orchestra", "Quartet", "Project"]
+CITY_SUFFIXES = ["Falls", "Springs", "City", "Point"]
+BATCH_SIZE = 50000
+
+
+def _array(values):
+    return "{" + ",".join('"%s"' % value for value in values) + "}"
+
+
+def _bool(value):
+    return "t" if value else "f"
+
+
+def _copy(cursor, table, columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+        if count % BATCH_SIZE == 0:
+            _flush(cursor, table, columns, buffer)
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+    _flush(cursor, table, columns, buffer)
+    return count
+
+
+def _flush(cursor, table, columns, buffer):
+    buffer.seek(0)
+    cursor.copy_expert(
+        f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer
+    )
+
+
+def _cities(rng, count=300):
+    return [
+        (
+            f"{rng.choice(WORDS)} {rng.choice(CITY_SUFFIXES)} {i}",
+            rng.choice(STATES),
+        )
+        for i in range(count)
+    ]
+
+
+def venue_rows(rng, count, cities):
+    for i in range(1, count + 1):
+        city, state = rng.choice(cities)
+        yield (
+            i,
+            f"The {rng.choice(WORDS)} {rng.choice(VENUE_KINDS)} {i}",
+            city,
+            state,
+            f"{rng.randint(1, 9999)} {rng.choice(WORDS)} Street",
+            f"{rng.randint(200, 999)}-555-{rng.randint(1000, 9999)}",
+            f"https://images.example.com/venues/{i}.jpg",
+            f"https://www.facebook.com/venue{i}",
+            _array(rng.sample(GENRES, rng.randint(1, 4))),
+            f"https://venue{i}.example.com",
+            _bool(rng.random() < 0.3),
+            "Looking for local acts." if rng.random() < 0.3 else "",
+        )
+
+
+def artist_rows(rng, count, cities):
+    for i in range(1, count + 1):
+        city, state = rng.choice(cities)
+        yield (
+            i,
+            f"{rng.choice(WORDS)} {rng.choice(WORDS)} {rng.choice(ARTIST_KINDS)} {i}",
+            city,
+            state,
+            f"{rng.randint(200, 999)}-555-{rng.randint(1000, 9999)}",
+            _array(rng.sample(GENRES, rng.randint(1, 3))),
+            f"https://images.example.com/artists/{i}.jpg",
+            f"https://www.facebook.com/artist{i}",
+            f"https://artist{i}.example.com",
+            _bool(rng.random() < 0.3),
+            "Available for weekend shows." if rng.random() < 0.3 else "",
+        )
+
+
+def show_rows(rng, count, venues, artists, anchor):
+    # Skewed towards low ids so some venues/artists have thousands of shows,
+    # like the long-running ones that make detail pages slow.
+    for i in range(1, count + 1):
+        venue_id = min(int(rng.paretovariate(1.2)), venues)
+        artist_id = min(int(rng.paretovariate(1.2)), artists)
+        if rng.random() < 0.5:
+            venue_id = rng.randint(1, venues)
+            artist_id = rng.randint(1, artists)
+        days = rng.randint(-3 * 365, 120)
+        start = anchor + timedelta(days=days, hours=rng.choice([18, 19, 20, 21]))
+        yield (i, venue_id, artist_id, start.isoformat(sep=" "))
+
+
+def seed(connection, venues, artists, shows, seed_value, anchor):
+    rng = random.Random(seed_value)
+    cities = _cities(rng)
+    cursor = connection.cursor()
+    started = time.perf_counter()
+
+    n = _copy(
+        cursor,
+        "venues",
+        [
+            "id",
+            "name",
+            "city",
+            "state",
+            "address",
+            "phone",
+            "image_link",
+            "facebook_link",
+            "genres",
+            "website_link",
+            "looking_for_talent",
+            "seeking_description",
+        ],
+        venue_rows(rng, venues, cities),
+    )
+    print(f"venues:  {n}")
+    n = _copy(
+        cursor,
+        "artists",
+        [
+            "id",
+            "name",
+            "city",
+            "state",
+            "phone",
+            "genres",
+            "image_link",
+            "facebook_link",
+            "website_link",
+            "looking_for_venue",
+            "seeking_description",
+        ],
+        artist_rows(rng, artists, cities),
+    )
+    print(f"artists: {n}")
+    n = _copy(
+        cursor,
+        "shows",
+        ["id", "venue_id", "artist_id", "start_time"],
+        show_rows(rng, shows, venues, artists, anchor),
+    )
+    print(f"shows:   {n}")
+
+    for table in ("venues", "artists", "shows"):
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+            f"(SELECT COALESCE(MAX(id), 1) FROM {table}))"
+        )
+    cursor.execute("ANALYZE venues, artists, shows")
+    connection.commit()
+    print(f"seeded in {time.perf_counter() - started:.1f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--venues", type=int, default=50000)
+    parser.add_argument("--artists", type=int, default=50000)
+    parser.add_argument("--shows", type=int, default=1000000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument(
+        "--anchor",
+        type=date.fromisoformat,
+        default=date.today(),
+        help="date the show times are spread around (default: today)",
+    )
+    parser.add_argument(
+        "--reset",
+        action="store_true",
+        help="truncate venues, artists and shows before seeding",
+    )
+    parser.add_argument(
+        "--matches",
+        action="store_true",
+        help="build the matches too (grows with venues x artists)",
+    )
+    args = parser.parse_args(argv)
+
+    import matchmaking
+    import partitions
+    from app import create_app
+    from models import db
+
+    app = create_app()
+
+    with app.app_context():
+        connection = db.engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            if args.reset:
+                cursor.execute(
+                    "TRUNCATE matches, shows, venues, artists RESTART IDENTITY"
+                )
+            else:
+                cursor.execute("SELECT EXISTS (SELECT 1 FROM venues)")
+                if cursor.fetchone()[0]:
+                    sys.exit(
+                        "Database already has venues; pass --reset to replace them."
+                    )
+            seed(
+                connection,
+                args.venues,
+                args.artists,
+                args.shows,
+                args.seed,
+                datetime.combine(args.anchor, datetime.min.time()),
+            )
+        finally:
+            connection.close()
+
+        # Move the shows out of the default partition into monthly ones.
+        with db.engine.begin() as conn:
+            created = partitions.ensure_partitions(
+                conn, datetime.now(), app.config["SHOWS_PARTITIONS_AHEAD"]
+            )
+        print(f"created {len(created)} shows partitions")
+
+        if args.matches:
+            started = time.perf_counter()
+            matches = matchmaking.rebuild_matches(app.config["MATCHES_PER_PAGE"])
+            db.session.commit()
+            print(f"matches: {matches} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
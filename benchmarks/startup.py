@@ -0,0 +1,119 @@
+"""Startup budget check for ``import app`` and ``create_app()``.
+
+Each run is a fresh interpreter, so module caches from earlier runs do not
+hide import cost. Reports the median of the runs and the heaviest imports
+(from ``python -X importtime``), and exits with status 1 when a budget is
+exceeded or create_app() imports something that should stay lazy or
+connects to the database.
+
+    python -m benchmarks.startup [--runs 5] [--import-budget-ms 900]
+        [--create-budget-ms 100] [--top 15]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Only needed by the views that use them, so create_app() must not pay for
+# them.
+LAZY_MODULES = ["wtforms", "flask_wtf", "babel", "dateutil"]
+
+IMPORT_BUDGET_MS = 900
+CREATE_BUDGET_MS = 100
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+application = app.create_app()
+created = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "create_ms": (created - imported) * 1000,
+    "loaded": [m for m in %r if m in sys.modules],
+    "engines": len(application.extensions["sqlalchemy"].connectors),
+}))
+""" % (LAZY_MODULES,)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run(*args):
+    return subprocess.run(
+        [sys.executable, *args],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def heaviest_imports(top):
+    """The ``top`` slowest imports of ``import app`` by cumulative time."""
+    stderr = _run("-X", "importtime", "-c", "import app").stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def probe(runs):
+    """The timings, lazy modules loaded and engines created of ``runs`` runs."""
+    return [json.loads(_run("-c", PROBE).stdout) for _ in range(runs)]
+
+
+def budget_failures(
+    results, import_budget_ms=IMPORT_BUDGET_MS, create_budget_ms=CREATE_BUDGET_MS
+):
+    """What the probe() ``results`` got wrong, as messages."""
+    failures = []
+    if statistics.median(r["import_ms"] for r in results) > import_budget_ms:
+        failures.append("import app is over budget")
+    if statistics.median(r["create_ms"] for r in results) > create_budget_ms:
+        failures.append("create_app() is over budget")
+    loaded = sorted({m for r in results for m in r["loaded"]})
+    if loaded:
+        failures.append(f"create_app() imported {', '.join(loaded)}")
+    if any(r["engines"] for r in results):
+        failures.append("create_app() created a database engine")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument("--create-budget-ms", type=float, default=CREATE_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    results = probe(args.runs)
+    import_ms = statistics.median(r["import_ms"] for r in results)
+    create_ms = statistics.median(r["create_ms"] for r in results)
+
+    print(f"median of {args.runs} runs:")
+    print(f"  import app    {import_ms:8.1f} ms (budget {args.import_budget_ms:g})")
+    print(f"  create_app()  {create_ms:8.1f} ms (budget {args.create_budget_ms:g})")
+    print()
+    print("heaviest imports (cumulative):")
+    for cumulative, name in heaviest_imports(args.top):
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    failures = budget_failures(results, args.import_budget_ms, args.create_budget_ms)
+    print()
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
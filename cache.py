@@ -0,0 +1,370 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, g, jsonify, make_response, request, session
+from flask.signals import Namespace
+
+from ops_access import ops_only
+from profiler import PROFILED
+
+# Sent with hit=True or hit=False for every lookup of a cached view.
+cache_lookup = Namespace().signal("response-cache-lookup")
+
+
+class LRUBackend:
+    """In-process cache holding at most ``max_entries`` items."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires is not None and expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def sweep(self):
+        """Drop expired items; returns how many were dropped."""
+        now = time.monotonic()
+        with self._lock:
+            expired = [
+                key
+                for key, (_, expires) in self._data.items()
+                if expires is not None and expires < now
+            ]
+            for key in expired:
+                del self._data[key]
+        return len(expired)
+
+
+class FileSystemBackend:
+    """Cache stored as one pickle per key, shared by every worker on a host.
+
+    Each file's mtime is set to when it expires (far ahead for items without
+    a ttl), so ``sweep()`` can drop expired files and, past ``max_entries``,
+    the ones expiring soonest without opening them. Each process sweeps
+    every ``sweep_every`` sets; `flask cache-sweep` does it from cron.
+    """
+
+    # Stands in for "never" in the mtime of items without a ttl.
+    _NO_EXPIRY = 10 * 365 * 24 * 3600
+
+    def __init__(self, directory, max_entries=10000, sweep_every=100):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.sweep_every = sweep_every
+        self._sets = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(
+            self.directory, hashlib.sha1(key.encode("utf-8")).hexdigest()
+        )
+
+    def get(self, key):
+        try:
+            with open(self._path(key), "rb") as f:
+                value, expires = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        if expires is not None and expires < time.time():
+            return None
+        return value
+
+    def set(self, key, value, ttl=None):
+        expires = time.time() + ttl if ttl else None
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump((value, expires), f, pickle.HIGHEST_PROTOCOL)
+        mtime = expires or time.time() + self._NO_EXPIRY
+        os.utime(tmp, (mtime, mtime))
+        os.replace(tmp, self._path(key))
+        self._sets += 1
+        if self._sets % self.sweep_every == 0:
+            self.sweep()
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            os.remove(os.path.join(self.directory, name))
+
+    def sweep(self):
+        """Drop expired files, then the soonest to expire past ``max_entries``.
+
+        Returns how many files were dropped. Temporary files of another
+        worker's set() are left alone unless a minute old.
+        """
+        now = time.time()
+        expired, live = [], []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                try:
+                    mtime = entry.stat().st_mtime
+                except OSError:
+                    continue
+                if entry.name.startswith(".tmp"):
+                    if mtime < now - 60:
+                        expired.append(entry.path)
+                elif mtime < now:
+                    expired.append(entry.path)
+                else:
+                    live.append((mtime, entry.path))
+        live.sort()
+        excess = [path for _, path in live[: max(len(live) - self.max_entries, 0)]]
+        removed = 0
+        for path in expired + excess:
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+
+class _AppCache:
+    """One app's response cache: its backend, ttl and hit counts."""
+
+    def __init__(self, backend, ttl):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def tag_version(self, tag):
+        # A version is (unique id, time of the invalidation that made it).
+        version = self.backend.get("tag-version:" + tag)
+        if version is None:
+            version = (uuid.uuid4().hex, 0.0)
+            self.backend.set("tag-version:" + tag, version)
+        return version
+
+    def invalidate(self, tags):
+        for tag in tags:
+            self.backend.set("tag-version:" + tag, (uuid.uuid4().hex, time.time()))
+
+    def fresh(self, entry, tags):
+        return entry is not None and all(
+            entry["tags"].get(tag) == self.backend.get("tag-version:" + tag)
+            for tag in tags
+        )
+
+    def storable(self, versions, replica_lag):
+        # Not if a tag was invalidated while the page was built, nor if a
+        # replica built it less than ``replica_lag`` seconds after one was.
+        now = time.time()
+        for tag, version in versions.items():
+            if self.backend.get("tag-version:" + tag) != version:
+                return False
+            if now - version[1] < replica_lag:
+                return False
+        return True
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "pid": os.getpid(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class ResponseCache:
+    """Caches rendered GET responses, invalidated by tag from write handlers.
+
+    Each cached view names the tags its content depends on (formatted with the
+    view arguments, e.g. ``"venue:{venue_id}"``). A cached response remembers
+    the version of each tag when it was stored; ``invalidate()`` gives the tag
+    a new version so every response built on the old one is skipped.
+
+    With read replicas, a client that just wrote is neither served from nor
+    stored in the cache, and a page read from a replica within
+    READ_YOUR_WRITES_SECONDS of an invalidation is not stored, as the
+    replica may not have the write yet.
+
+    Each app's backend and counts are kept in ``app.extensions``; the
+    methods act on the current app's.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        kind = app.config.get("RESPONSE_CACHE_BACKEND", "lru")
+        if kind == "lru":
+            backend = LRUBackend(app.config.get("RESPONSE_CACHE_MAX_ENTRIES", 1024))
+        elif kind == "filesystem":
+            backend = FileSystemBackend(
+                app.config["RESPONSE_CACHE_DIR"],
+                app.config.get("RESPONSE_CACHE_DIR_MAX_ENTRIES", 10000),
+            )
+        elif kind is None:
+            backend = None
+        else:
+            raise ValueError(f"Unknown RESPONSE_CACHE_BACKEND {kind!r}")
+        app.extensions["response_cache"] = _AppCache(
+            backend, app.config.get("RESPONSE_CACHE_TTL", 300)
+        )
+        app.add_url_rule("/_cache/stats", "cache_stats", ops_only(self._stats_view))
+
+    def _app_cache(self):
+        return current_app.extensions["response_cache"]
+
+    @property
+    def backend(self):
+        """The current app's backend, or None when it caches nothing."""
+        return self._app_cache().backend
+
+    def invalidate(self, *tags):
+        cache = self._app_cache()
+        if cache.backend is not None:
+            cache.invalidate(tags)
+
+    def _bypassed(self):
+        # The client wrote moments ago and reads from the primary (see
+        # models.route_reads), so neither older nor newer pages are shared.
+        return session.get("primary_until", 0) > time.time()
+
+    def _replica_lag(self):
+        if g.get("db_replica") is None:
+            return 0
+        return current_app.config.get("READ_YOUR_WRITES_SECONDS", 0)
+
+    def cached_value(self, key, tags, compute):
+        """``compute()``, kept under ``key`` until one of ``tags`` is invalidated."""
+        cache = self._app_cache()
+        if cache.backend is None or self._bypassed():
+            return compute()
+        key = "value:" + key
+        entry = cache.backend.get(key)
+        if cache.fresh(entry, tags):
+            return entry["value"]
+        versions = {tag: cache.tag_version(tag) for tag in tags}
+        value = compute()
+        if cache.storable(versions, self._replica_lag()):
+            cache.backend.set(key, {"value": value, "tags": versions}, cache.ttl)
+        return value
+
+    def _key(self, arg_names):
+        args = [(name, request.args.getlist(name)) for name in arg_names]
+        view_args = sorted((request.view_args or {}).items())
+        return f"response:{request.endpoint}:{view_args!r}:{args!r}"
+
+    def cached(self, *tags, args=()):
+        """Cache the view's responses under ``tags``.
+
+        ``args`` names the query arguments the view reads; the response is
+        keyed on those alone, so other arguments cannot add entries.
+        """
+        arg_names = args
+
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                cache = self._app_cache()
+                # Pages render pending flash messages, so they must be built
+                # (and the messages consumed) by the view itself, as must a
+                # profiled request's page for the profile to show the view.
+                if (
+                    cache.backend is None
+                    or request.method not in ("GET", "HEAD")
+                    or "_flashes" in session
+                    or self._bypassed()
+                    or PROFILED in request.environ
+                ):
+                    return view(*args, **kwargs)
+
+                key = self._key(arg_names)
+                entry_tags = [tag.format(**kwargs) for tag in tags]
+                entry = cache.backend.get(key)
+                if cache.fresh(entry, entry_tags):
+                    cache.hits += 1
+                    cache_lookup.send(self, hit=True)
+                    response = current_app.response_class(
+                        entry["body"], status=entry["status"], headers=entry["headers"]
+                    )
+                    response.headers["X-Cache"] = "HIT"
+                    return response
+
+                cache.misses += 1
+                cache_lookup.send(self, hit=False)
+                versions = {tag: cache.tag_version(tag) for tag in entry_tags}
+                replica_lag = self._replica_lag()
+                response = make_response(view(*args, **kwargs))
+                if response.status_code == 200:
+                    entry = {
+                        "status": response.status_code,
+                        "headers": list(response.headers.items()),
+                        "tags": versions,
+                    }
+                    if response.is_streamed:
+                        response.response = _tee(
+                            cache,
+                            response.response,
+                            response.charset,
+                            key,
+                            entry,
+                            replica_lag,
+                        )
+                    elif cache.storable(versions, replica_lag):
+                        entry["body"] = response.get_data()
+                        cache.backend.set(key, entry, cache.ttl)
+                response.headers["X-Cache"] = "MISS"
+                return response
+
+            return wrapper
+
+        return decorator
+
+    def stats(self):
+        """Hits and misses of this process since it started.
+
+        Each worker keeps its own counts, even when they share a
+        filesystem backend, so /_cache/stats shows the worker that answered.
+        """
+        return self._app_cache().stats()
+
+    def _stats_view(self):
+        return jsonify(self.stats())
+
+
+def _tee(cache, chunks, charset, key, entry, replica_lag):
+    # Streamed pages are stored once fully sent; a client that
+    # disconnects part way leaves nothing behind.
+    body = []
+    for chunk in chunks:
+        body.append(chunk if isinstance(chunk, bytes) else chunk.encode(charset))
+        yield chunk
+    if cache.storable(entry["tags"], replica_lag):
+        entry["body"] = b"".join(body)
+        cache.backend.set(key, entry, cache.ttl)
+
+
+response_cache = ResponseCache()
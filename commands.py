@@ -0,0 +1,216 @@
+import json
+from datetime import datetime
+
+import click
+from sqlalchemy import event, func
+
+import assets
+import matchmaking
+import partitions
+import queries
+import template_cache
+from cache import response_cache
+from models import db, Venue, Artist
+
+
+def _capture_statements(fn):
+    """Run ``fn`` and return the (statement, parameters) pairs it executed."""
+    captured = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        captured.append((statement, parameters))
+
+    engine = db.engine
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return captured
+
+
+def _plan_indexes(plan):
+    found = set()
+    if "Index Name" in plan:
+        found.add(plan["Index Name"])
+    for child in plan.get("Plans", []):
+        found |= _plan_indexes(child)
+    return found
+
+
+def _explain(statement, parameters):
+    # Small or freshly seeded tables make a sequential scan look cheapest;
+    # disable it so the check answers "can this query use the index".
+    with db.engine.connect() as conn:
+        with conn.begin():
+            conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+            plan = conn.exec_driver_sql(
+                "EXPLAIN (FORMAT JSON) " + statement, parameters
+            ).scalar()
+            # Plans name the partitions' indexes; report the shows index
+            # each one was created from.
+            parents = dict(
+                conn.exec_driver_sql(
+                    "SELECT c.relname, p.relname FROM pg_inherits i "
+                    "JOIN pg_class c ON c.oid = i.inhrelid "
+                    "JOIN pg_class p ON p.oid = i.inhparent "
+                    "WHERE c.relkind = 'i'"
+                ).all()
+            )
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return {parents.get(name, name) for name in _plan_indexes(plan[0]["Plan"])}
+
+
+def register_commands(app):
+    @app.cli.command("build-assets")
+    def build_assets():
+        """Build the hashed, precompressed CSS/JS bundles into static/dist."""
+        manifest = assets.build(app.static_folder, app.static_url_path)
+        for name, filename in sorted(manifest.items()):
+            click.echo(f"{name} -> {assets.DIST_DIR}/{filename}")
+
+    @app.cli.command("compile-templates")
+    def compile_templates():
+        """Compile every template into the shared bytecode cache."""
+        if app.jinja_env.bytecode_cache is None:
+            raise click.ClickException("TEMPLATE_BYTECODE_CACHE_DIR is not set")
+        names = template_cache.compile_templates(app)
+        click.echo(
+            f"compiled {len(names)} templates into "
+            f"{app.config['TEMPLATE_BYTECODE_CACHE_DIR']}"
+        )
+
+    @app.cli.command("cache-sweep")
+    def cache_sweep():
+        """Drop expired response cache entries, and the excess past the cap."""
+        if response_cache.backend is None:
+            raise click.ClickException("RESPONSE_CACHE_BACKEND is not set")
+        removed = response_cache.backend.sweep()
+        click.echo(f"removed {removed} cache entries")
+
+    @app.cli.command("build-matches")
+    def build_matches():
+        """Recompute every artist-venue match in one transaction."""
+        count = matchmaking.rebuild_matches(app.config["MATCHES_PER_PAGE"])
+        db.session.commit()
+        response_cache.invalidate("matches")
+        click.echo(f"{count} matches")
+
+    @app.cli.command("partition-shows")
+    @click.option(
+        "--ahead",
+        type=int,
+        default=None,
+        help="Months to create partitions for after this one "
+        "(default: SHOWS_PARTITIONS_AHEAD).",
+    )
+    @click.option(
+        "--archive-before",
+        type=click.DateTime(["%Y-%m-%d", "%Y-%m"]),
+        default=None,
+        help="Detach the partitions of earlier months into the archive schema "
+        "(default: SHOWS_ARCHIVE_AFTER_MONTHS ago, if set).",
+    )
+    def partition_shows(ahead, archive_before):
+        """Create the upcoming monthly shows partitions and archive old ones."""
+        today = datetime.now()
+        if ahead is None:
+            ahead = app.config["SHOWS_PARTITIONS_AHEAD"]
+        archive_months = app.config["SHOWS_ARCHIVE_AFTER_MONTHS"]
+        if archive_before is None and archive_months is not None:
+            archive_before = partitions.add_months(
+                partitions.month_start(today), -archive_months
+            )
+
+        with db.engine.begin() as conn:
+            created = partitions.ensure_partitions(conn, today, ahead)
+            archived = []
+            venue_ids, artist_ids = set(), set()
+            if archive_before is not None:
+                archived = partitions.archive_partitions(conn, archive_before)
+                venue_ids, artist_ids = partitions.archived_ids(conn, archived)
+        for name in created:
+            click.echo(f"created {name}")
+        for name in archived:
+            click.echo(f"archived {name} to {partitions.ARCHIVE_SCHEMA}.{name}")
+        if archived:
+            # Their past shows leave the venue and artist pages too.
+            response_cache.invalidate(
+                "shows",
+                *[f"venue:{venue_id}" for venue_id in venue_ids],
+                *[f"artist:{artist_id}" for artist_id in artist_ids],
+            )
+
+    @app.cli.command("check-indexes")
+    def check_indexes():
+        """EXPLAIN the show queries of the hot pages and check their indexes.
+
+        The pages are requested through the test client, so the statements
+        checked are the ones the views run.
+        """
+        venue_id = db.session.query(func.min(Venue.id)).scalar() or 0
+        artist_id = db.session.query(func.min(Artist.id)).scalar() or 0
+        cursor = queries.encode_show_cursor(datetime.now(), 0)
+        # Every statement must reach this engine, not the response cache or
+        # the asyncpg one.
+        app.extensions["response_cache"].backend = None
+        app.extensions["async_reads"].enabled = False
+        client = app.test_client()
+
+        def get(path):
+            return lambda: client.get(path).get_data()
+
+        checks = [
+            # Aggregating every venue may drive from the start_time range or
+            # from the per-venue index; either avoids a scan of past shows.
+            (
+                "venues",
+                ("ix_shows_venue_id_start_time", "ix_shows_start_time_id"),
+                get("/venues"),
+            ),
+            (
+                "show_venue",
+                ("ix_shows_venue_id_start_time",),
+                get(f"/venues/{venue_id}"),
+            ),
+            # A page of past shows may also walk (start_time, id) backwards
+            # from the cursor: for a busy venue that finds the page sooner.
+            (
+                "show_venue_past_shows(after)",
+                ("ix_shows_venue_id_start_time", "ix_shows_start_time_id"),
+                get(f"/venues/{venue_id}/past_shows?after={cursor}"),
+            ),
+            (
+                "show_artist",
+                ("ix_shows_artist_id_start_time",),
+                get(f"/artists/{artist_id}"),
+            ),
+            (
+                "show_artist_past_shows(after)",
+                ("ix_shows_artist_id_start_time", "ix_shows_start_time_id"),
+                get(f"/artists/{artist_id}/past_shows?after={cursor}"),
+            ),
+            ("shows", ("ix_shows_start_time_id",), get("/shows")),
+            (
+                "shows(after)",
+                ("ix_shows_start_time_id",),
+                get(f"/shows?after={cursor}"),
+            ),
+        ]
+
+        failed = False
+        for label, expected, fn in checks:
+            used = set()
+            for statement, parameters in _capture_statements(fn):
+                if "shows" in statement:
+                    used |= _explain(statement, parameters)
+            ok = bool(used.intersection(expected))
+            failed = failed or not ok
+            click.echo(
+                f"{'ok  ' if ok else 'FAIL'} {label}: "
+                f"expected {' or '.join(expected)}, "
+                f"plan used {', '.join(sorted(used)) or 'no index'}"
+            )
+        if failed:
+            raise SystemExit(1)
@@ -5,11 +5,23 @@ from fabric.contrib.console import confirm
 
 
 def test():
+    with settings(warn_only=True):
+        result = local("python -m pytest", capture=True)
+    if result.failed and not confirm("Tests failed. Continue?"):
+        abort("Aborted at user request.")
+
+
+def benchmark():
+    # Needs a database seeded with `python -m benchmarks.seed` and a baseline
+    # saved earlier with `python -m benchmarks.routes --save-baseline`.
     with settings(warn_only=True):
         result = local(
-            "python test_tasks.py -v && python test_users.py -v", capture=True
+            "python -m benchmarks.routes --baseline benchmarks/baseline.json"
+            " --output bench_output.json",
+            capture=True,
         )
-    if result.failed and not confirm("Tests failed. Continue?"):
+    print(result)
+    if result.failed and not confirm("Benchmarks regressed. Continue?"):
         abort("Aborted at user request.")
 
 
@@ -24,6 +36,7 @@ def push():
 
 def prepare():
     test()
+    benchmark()
     commit()
     push()
 
@@ -47,6 +60,7 @@ def heroku_test():
 def deploy():
     pull()
     test()
+    benchmark()
     commit()
     heroku()
     heroku_test()
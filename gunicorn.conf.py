@@ -0,0 +1,68 @@
+# Prefork settings for `gunicorn -c gunicorn.conf.py wsgi:app`.
+import multiprocessing
+import os
+
+bind = "0.0.0.0:" + os.environ.get("PORT", "8000")
+
+# One process per core (plus one so a worker blocked on the database does
+# not leave a core idle), each with a few threads for I/O waits. With
+# ASYNC_READS=1 a thread waiting on a read holds no connection of its own, so
+# WEB_THREADS can be raised well above the pool size.
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() + 1))
+threads = int(os.environ.get("WEB_THREADS", 4))
+worker_class = "gthread"
+
+# Load the app once in the master so workers share its memory pages.
+preload_app = True
+
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers periodically, staggered so they don't all restart at once.
+max_requests = 2000
+max_requests_jitter = 200
+
+accesslog = "-"
+errorlog = "-"
+
+# Workers share Prometheus metrics through files in PROMETHEUS_MULTIPROC_DIR.
+# It must exist before the app is preloaded, and files left by a previous run
+# would be added to this one's.
+_metrics_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+if _metrics_dir:
+    os.makedirs(_metrics_dir, exist_ok=True)
+    for _name in os.listdir(_metrics_dir):
+        os.remove(os.path.join(_metrics_dir, _name))
+
+
+def on_starting(server):
+    # Build the CSS/JS bundles on the host that serves them.
+    import assets
+
+    assets.build(os.path.join(os.path.dirname(os.path.abspath(__file__)), "static"))
+
+
+def when_ready(server):
+    # Compile the templates once, into the shared bytecode cache and into
+    # the preloaded app, so workers do not compile them on first render.
+    import template_cache
+
+    template_cache.compile_templates(server.app.wsgi())
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
+
+
+def post_fork(server, worker):
+    # Connections must not be shared across processes. create_app() does
+    # not connect, so workers normally start without any pool; drop any the
+    # master did open (e.g. from a hook) so each worker opens its own.
+    app = server.app.wsgi()
+    for connector in app.extensions["sqlalchemy"].connectors.values():
+        connector.get_engine().dispose()
+    app.extensions["db_replicas"].dispose()
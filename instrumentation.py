@@ -0,0 +1,143 @@
+import re
+import time
+from collections import Counter
+from functools import partial
+
+from flask import g, has_app_context, request
+from flask.signals import Namespace
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Bound parameters already keep values out of the statement text; this also
+# folds numbered/expanded parameters ("%(id_1_1)s, %(id_1_2)s") into one shape.
+_EXPANDED_PARAM = re.compile(r"%\(([a-z_]+(?:_\d+)?)_\d+\)s")
+
+
+# Sent with the request's endpoint and QueryStats once its queries are
+# counted: when the response is returned, or for a streamed page, once it
+# has been sent.
+query_stats_reported = Namespace().signal("query-stats-reported")
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def record(self, statement, duration):
+        self.count += 1
+        self.duration += duration
+        self.shapes[_EXPANDED_PARAM.sub(r"%(\1)s", statement)] += 1
+
+    def repeated(self, threshold):
+        return [
+            (shape, count)
+            for shape, count in self.shapes.most_common()
+            if count >= threshold
+        ]
+
+
+def current_query_stats():
+    """Stats for the request being handled, or None outside a request."""
+    if not has_app_context():
+        return None
+    return g.get("_query_stats")
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, many):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, many):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    stats = current_query_stats()
+    if stats is not None:
+        stats.record(statement, elapsed)
+
+
+def _handle_error(context):
+    if context.connection is not None:
+        starts = context.connection.info.get("query_start_time")
+        if starts:
+            starts.pop()
+
+
+def init_query_instrumentation(app):
+    """Count statements and DB time per request and flag suspected N+1s.
+
+    Listeners are attached to the Engine class so they also cover engines
+    that are created later (e.g. lazily in each worker process).
+    """
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+
+    @app.before_request
+    def start_query_stats():
+        g._query_stats = QueryStats()
+
+    @app.after_request
+    def report_query_stats(response):
+        if response.is_streamed:
+            # Streamed pages keep querying while the body is sent, so they
+            # are reported once it has been, and cannot carry the headers.
+            # They are only streamed when budgets are not strict (see
+            # stream_page()), so going over budget is only logged.
+            stats = g.get("_query_stats")
+            if stats is not None:
+                report = partial(
+                    _report, app, request.method, request.path, request.endpoint, stats
+                )
+                response.call_on_close(lambda: _warn_over_budget(app, report()))
+            return response
+
+        stats = g.pop("_query_stats", None)
+        if stats is None:
+            return response
+
+        response.headers["X-DB-Query-Count"] = str(stats.count)
+        response.headers["X-DB-Time-ms"] = f"{stats.duration * 1000:.2f}"
+        message = _report(app, request.method, request.path, request.endpoint, stats)
+        if message and app.config["QUERY_BUDGET_STRICT"]:
+            raise QueryBudgetExceeded(message)
+        _warn_over_budget(app, message)
+        return response
+
+
+def _report(app, method, path, endpoint, stats):
+    """Log ``stats``; returns a message if they are over the endpoint's budget."""
+    query_stats_reported.send(app, endpoint=endpoint, stats=stats)
+    app.logger.info(
+        "%s %s [%s]: %d queries, %.2f ms in database",
+        method,
+        path,
+        endpoint,
+        stats.count,
+        stats.duration * 1000,
+    )
+
+    for shape, count in stats.repeated(app.config["N_PLUS_ONE_THRESHOLD"]):
+        app.logger.warning(
+            "Suspected N+1 in %s: statement ran %d times: %s",
+            endpoint,
+            count,
+            " ".join(shape.split()),
+        )
+
+    budget = app.config["QUERY_BUDGETS"].get(
+        endpoint, app.config["QUERY_BUDGET_DEFAULT"]
+    )
+    if budget is not None and stats.count > budget:
+        return f"{endpoint} ran {stats.count} queries, budget is {budget}"
+    return None
+
+
+def _warn_over_budget(app, message):
+    if message:
+        app.logger.warning(message)
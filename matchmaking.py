@@ -0,0 +1,239 @@
+from collections import namedtuple
+
+from sqlalchemy import delete, select, text
+
+from models import db, Artist, Match, Venue
+
+# A match's score: each shared genre counts GENRE_WEIGHT, the same state
+# STATE_WEIGHT more, and the same city on top of that CITY_WEIGHT more.
+GENRE_WEIGHT = 10
+STATE_WEIGHT = 3
+CITY_WEIGHT = 5
+
+# Matches kept per artist and per venue: a pair is stored while it is among
+# the best KEEP of either side (by score, then id), so each side's list is
+# its first KEEP rows and the table grows with profiles, not with pairs.
+KEEP = 10
+
+# Refreshes rely on every list being complete before they start, so they
+# run one at a time (a transaction-level advisory lock).
+_LOCK_KEY = 0x6D61746368
+
+# Pairs come from the GIN indexes on genres (&&): only an artist and a venue
+# that share a genre and are both seeking are matched.
+_PAIRS = """
+SELECT a.id AS artist_id, v.id AS venue_id, shared.genres AS shared_genres,
+       cardinality(shared.genres) * :genre_weight
+       + CASE WHEN a.state = v.state THEN :state_weight ELSE 0 END
+       + CASE WHEN a.state = v.state AND lower(a.city) = lower(v.city)
+              THEN :city_weight ELSE 0 END AS score
+FROM artists a
+JOIN venues v ON v.genres && a.genres
+CROSS JOIN LATERAL (
+    SELECT ARRAY(SELECT unnest(a.genres) INTERSECT SELECT unnest(v.genres)) AS genres
+) shared
+WHERE a.looking_for_venue AND v.looking_for_talent
+"""
+
+_UPSERT = """
+ON CONFLICT (artist_id, venue_id) DO UPDATE
+SET shared_genres = EXCLUDED.shared_genres, score = EXCLUDED.score
+"""
+
+# One side of a match: the column of the profile being refreshed, the
+# column of its counterparts, and their aliases in _PAIRS.
+_Side = namedtuple("_Side", "own other alias other_alias")
+_ARTIST = _Side("artist_id", "venue_id", "a", "v")
+_VENUE = _Side("venue_id", "artist_id", "v", "a")
+
+
+def _ahead(owner, member, row):
+    """SQL counting the stored matches ahead of ``row`` in its ``owner``'s list."""
+    return (
+        f"(SELECT count(*) FROM matches b WHERE b.{owner} = {row}.{owner} "
+        f"AND (b.score > {row}.score OR (b.score = {row}.score "
+        f"AND b.{member} < {row}.{member})))"
+    )
+
+
+def _execute(sql, **params):
+    return db.session.execute(
+        text(sql),
+        {
+            "genre_weight": GENRE_WEIGHT,
+            "state_weight": STATE_WEIGHT,
+            "city_weight": CITY_WEIGHT,
+            **params,
+        },
+    )
+
+
+def _lock():
+    db.session.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _LOCK_KEY})
+
+
+def rebuild_matches(keep=KEEP):
+    """Recompute every match in one statement; returns how many are kept.
+
+    Runs in the session's transaction, so readers see the old matches until
+    it commits.
+    """
+    _lock()
+    db.session.execute(delete(Match))
+    return _execute(
+        f"""
+        INSERT INTO matches (artist_id, venue_id, shared_genres, score)
+        SELECT artist_id, venue_id, shared_genres, score FROM (
+            SELECT p.*,
+                   row_number() OVER (PARTITION BY artist_id
+                                      ORDER BY score DESC, venue_id) AS artist_rank,
+                   row_number() OVER (PARTITION BY venue_id
+                                      ORDER BY score DESC, artist_id) AS venue_rank
+            FROM ({_PAIRS}) p
+        ) ranked
+        WHERE artist_rank <= :keep OR venue_rank <= :keep
+        """,
+        keep=keep,
+    ).rowcount
+
+
+def _listed_by(side, entity_id, keep):
+    """The counterparts whose list has ``entity_id`` among its best ``keep``."""
+    return set(
+        _execute(
+            f"SELECT m.{side.other} FROM matches m WHERE m.{side.own} = :id "
+            f"AND {_ahead(side.other, side.own, 'm')} < :keep",
+            id=entity_id,
+            keep=keep,
+        ).scalars()
+    )
+
+
+def _refill(side, counterpart_ids, keep, exclude=0):
+    # Puts back the best ``keep`` matches of counterparts whose list lost one.
+    if counterpart_ids:
+        _execute(
+            f"""
+            INSERT INTO matches (artist_id, venue_id, shared_genres, score)
+            SELECT artist_id, venue_id, shared_genres, score FROM (
+                SELECT p.*, row_number() OVER (
+                    PARTITION BY p.{side.other} ORDER BY p.score DESC, p.{side.own}
+                ) AS rank
+                FROM ({_PAIRS} AND {side.other_alias}.id = ANY(:ids)
+                      AND {side.alias}.id <> :exclude) p
+            ) ranked
+            WHERE rank <= :keep
+            {_UPSERT}
+            """,
+            ids=list(counterpart_ids),
+            exclude=exclude,
+            keep=keep,
+        )
+
+
+def _refresh(side, entity_id, keep):
+    _lock()
+    db.session.flush()
+    before = _listed_by(side, entity_id, keep)
+    removed = set(
+        _execute(
+            f"DELETE FROM matches WHERE {side.own} = :id RETURNING {side.other}",
+            id=entity_id,
+        ).scalars()
+    )
+    _refill(side, before, keep)
+    # Its own best ``keep``, and every pair it now makes a counterpart's list.
+    added = set(
+        _execute(
+            f"""
+            INSERT INTO matches (artist_id, venue_id, shared_genres, score)
+            SELECT artist_id, venue_id, shared_genres, score FROM (
+                SELECT p.*, row_number() OVER (
+                    ORDER BY p.score DESC, p.{side.other}
+                ) AS rank
+                FROM ({_PAIRS} AND {side.alias}.id = :id) p
+            ) ranked
+            WHERE rank <= :keep OR {_ahead(side.other, side.own, 'ranked')} < :keep
+            {_UPSERT}
+            RETURNING {side.other}
+            """,
+            id=entity_id,
+            keep=keep,
+        ).scalars()
+    )
+    # Pairs pushed out of a counterpart's list that neither side lists.
+    touched = removed | added
+    if touched:
+        _execute(
+            f"DELETE FROM matches m WHERE m.{side.other} = ANY(:ids) "
+            f"AND {_ahead(side.other, side.own, 'm')} >= :keep "
+            f"AND {_ahead(side.own, side.other, 'm')} >= :keep",
+            ids=list(touched),
+            keep=keep,
+        )
+    return before | _listed_by(side, entity_id, keep)
+
+
+def refresh_artist_matches(artist_id, keep=KEEP):
+    """Recompute the matches of one artist after its profile changed.
+
+    Call before the commit that saves the profile; pending changes are
+    flushed first so they are matched on. Returns the ids of the venues
+    that list the artist before or after, the only venue lists that change.
+    """
+    return _refresh(_ARTIST, artist_id, keep)
+
+
+def refresh_venue_matches(venue_id, keep=KEEP):
+    """refresh_artist_matches() for a venue; returns artist ids."""
+    return _refresh(_VENUE, venue_id, keep)
+
+
+def clear_venue_matches(venue_id, keep=KEEP):
+    """Drop a venue's matches; returns the ids of the artists that listed it.
+
+    Their lists are refilled from the other venues.
+    """
+    _lock()
+    listed_by = _listed_by(_VENUE, venue_id, keep)
+    db.session.execute(delete(Match).where(Match.venue_id == venue_id))
+    _refill(_VENUE, listed_by, keep, exclude=venue_id)
+    return listed_by
+
+
+def artist_matches_statement(artist_id, limit=KEEP):
+    """The best ``limit`` venues for an artist, from ix_matches_artist_id_score."""
+    return (
+        select(
+            Venue.id,
+            Venue.name,
+            Venue.city,
+            Venue.state,
+            Venue.image_link,
+            Match.shared_genres,
+            Match.score,
+        )
+        .join(Match, Match.venue_id == Venue.id)
+        .where(Match.artist_id == artist_id)
+        .order_by(Match.score.desc(), Match.venue_id)
+        .limit(limit)
+    )
+
+
+def venue_matches_statement(venue_id, limit=KEEP):
+    """The best ``limit`` artists for a venue, from ix_matches_venue_id_score."""
+    return (
+        select(
+            Artist.id,
+            Artist.name,
+            Artist.city,
+            Artist.state,
+            Artist.image_link,
+            Match.shared_genres,
+            Match.score,
+        )
+        .join(Match, Match.artist_id == Artist.id)
+        .where(Match.venue_id == venue_id)
+        .order_by(Match.score.desc(), Match.artist_id)
+        .limit(limit)
+    )
@@ -0,0 +1,164 @@
+import os
+import time
+import weakref
+
+from flask import Response, before_render_template, g, request, template_rendered
+from sqlalchemy.pool import QueuePool
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST,
+        REGISTRY,
+        CollectorRegistry,
+        Counter,
+        Gauge,
+        Histogram,
+        generate_latest,
+        multiprocess,
+    )
+except ImportError:
+    Counter = None
+
+from cache import cache_lookup
+from ops_access import ops_only
+
+if Counter is not None:
+    # With PROMETHEUS_MULTIPROC_DIR set (before this module is imported), each
+    # worker writes its values to a file there and /metrics adds them up.
+    REQUESTS = Counter(
+        "fyyur_http_requests_total",
+        "Requests handled, by endpoint, method and status.",
+        ["endpoint", "method", "status"],
+    )
+    REQUEST_LATENCY = Histogram(
+        "fyyur_http_request_duration_seconds",
+        "Time spent handling a request, by endpoint.",
+        ["endpoint"],
+    )
+    IN_PROGRESS = Gauge(
+        "fyyur_http_requests_in_progress",
+        "Requests being handled.",
+        multiprocess_mode="livesum",
+    )
+    TEMPLATE_RENDER = Histogram(
+        "fyyur_template_render_seconds",
+        "Time spent rendering a template, by template.",
+        ["template"],
+    )
+    CACHE_LOOKUPS = Counter(
+        "fyyur_response_cache_lookups_total",
+        "Response cache lookups, by result (hit or miss).",
+        ["result"],
+    )
+    POOL_CHECKOUTS = Counter(
+        "fyyur_db_pool_checkouts_total",
+        "Connections checked out of the database pools.",
+    )
+    POOL_WAIT = Histogram(
+        "fyyur_db_pool_wait_seconds",
+        "Time spent getting a connection from a database pool.",
+        buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    )
+    POOL_CHECKED_OUT = Gauge(
+        "fyyur_db_pool_checked_out",
+        "Connections currently checked out of the database pools.",
+        multiprocess_mode="livesum",
+    )
+    POOL_OVERFLOW = Gauge(
+        "fyyur_db_pool_overflow",
+        "Connections open beyond pool_size.",
+        multiprocess_mode="livesum",
+    )
+
+_pools = weakref.WeakSet()
+
+
+def _update_pool_gauges():
+    pools = list(_pools)
+    POOL_CHECKED_OUT.set(sum(pool.checkedout() for pool in pools))
+    POOL_OVERFLOW.set(sum(max(pool.overflow(), 0) for pool in pools))
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that reports checkouts, wait time and overflow to /metrics."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        _pools.add(self)
+
+    def connect(self):
+        started = time.perf_counter()
+        connection = super().connect()
+        POOL_WAIT.observe(time.perf_counter() - started)
+        POOL_CHECKOUTS.inc()
+        _update_pool_gauges()
+        return connection
+
+    def _do_return_conn(self, conn):
+        super()._do_return_conn(conn)
+        _update_pool_gauges()
+
+
+def _template_started(sender, template, context, **extra):
+    g.setdefault("_template_started", []).append(time.perf_counter())
+
+
+def _template_rendered(sender, template, context, **extra):
+    started = g.get("_template_started")
+    if started:
+        TEMPLATE_RENDER.labels(template.name or "<string>").observe(
+            time.perf_counter() - started.pop()
+        )
+
+
+def _cache_lookup(sender, hit):
+    CACHE_LOOKUPS.labels("hit" if hit else "miss").inc()
+
+
+def _metrics_view():
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+
+def init_metrics(app):
+    """Expose Prometheus metrics at /metrics when prometheus_client is installed.
+
+    Must run before the engines are created, so their pools are timed.
+    """
+    if Counter is None or not app.config.get("METRICS_ENABLED", True):
+        return
+
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        "poolclass": TimedQueuePool,
+        **app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}),
+    }
+    before_render_template.connect(_template_started, app)
+    template_rendered.connect(_template_rendered, app)
+    cache_lookup.connect(_cache_lookup)
+
+    @app.before_request
+    def start_request_timer():
+        g._request_started = time.perf_counter()
+        IN_PROGRESS.inc()
+
+    @app.after_request
+    def remember_status(response):
+        g._response_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def record_request(exc):
+        started = g.pop("_request_started", None)
+        if started is None:
+            return
+        IN_PROGRESS.dec()
+        # Unrouted URLs share one label so scanners cannot grow the series.
+        endpoint = request.endpoint or "unmatched"
+        REQUEST_LATENCY.labels(endpoint).observe(time.perf_counter() - started)
+        REQUESTS.labels(endpoint, request.method, g.pop("_response_status", 500)).inc()
+
+    app.add_url_rule("/metrics", "metrics", ops_only(_metrics_view))
@@ -0,0 +1,40 @@
+"""trigram indexes for name search
+
+Revision ID: 9c1d2e7a4b30
+Revises: 5f6c867f1a66
+Create Date: 2022-09-02 18:41:07.512093
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "9c1d2e7a4b30"
+down_revision = "5f6c867f1a66"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        "ix_venues_name_trgm",
+        "venues",
+        ["name"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"name": "gin_trgm_ops"},
+    )
+    op.create_index(
+        "ix_artists_name_trgm",
+        "artists",
+        ["name"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"name": "gin_trgm_ops"},
+    )
+
+
+def downgrade():
+    op.drop_index("ix_artists_name_trgm", table_name="artists")
+    op.drop_index("ix_venues_name_trgm", table_name="venues")
@@ -0,0 +1,33 @@
+"""cascade deletes of venues and artists to their shows
+
+Revision ID: a3e9c5d27b14
+Revises: f5c3a9d1b7e6
+Create Date: 2022-09-20 10:12:41.508317
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "a3e9c5d27b14"
+down_revision = "f5c3a9d1b7e6"
+branch_labels = None
+depends_on = None
+
+
+# Changing a foreign key of shows changes it on every partition; the new
+# one is checked against all live shows while shows is locked. Archived
+# partitions have no foreign keys, so their shows are kept.
+def _replace_foreign_keys(ondelete):
+    for column, table in (("venue_id", "venues"), ("artist_id", "artists")):
+        name = f"shows_{column}_fkey"
+        op.drop_constraint(name, "shows", type_="foreignkey")
+        op.create_foreign_key(name, "shows", table, [column], ["id"], ondelete=ondelete)
+
+
+def upgrade():
+    _replace_foreign_keys("CASCADE")
+
+
+def downgrade():
+    _replace_foreign_keys(None)
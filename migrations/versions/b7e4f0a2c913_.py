@@ -0,0 +1,59 @@
+"""composite indexes on shows
+
+Revision ID: b7e4f0a2c913
+Revises: 9c1d2e7a4b30
+Create Date: 2022-09-06 10:12:44.208415
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "b7e4f0a2c913"
+down_revision = "9c1d2e7a4b30"
+branch_labels = None
+depends_on = None
+
+
+# CREATE INDEX CONCURRENTLY cannot run inside a transaction, so these run in
+# an autocommit block and do not lock shows against writes while building.
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_shows_venue_id_start_time",
+            "shows",
+            ["venue_id", "start_time"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_shows_artist_id_start_time",
+            "shows",
+            ["artist_id", "start_time"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_shows_start_time_id",
+            "shows",
+            ["start_time", "id"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_shows_start_time_id", table_name="shows", postgresql_concurrently=True
+        )
+        op.drop_index(
+            "ix_shows_artist_id_start_time",
+            table_name="shows",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_shows_venue_id_start_time",
+            table_name="shows",
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,47 @@
+"""gin indexes on genres
+
+Revision ID: d41a6c3e8f52
+Revises: b7e4f0a2c913
+Create Date: 2022-09-09 14:27:51.630284
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "d41a6c3e8f52"
+down_revision = "b7e4f0a2c913"
+branch_labels = None
+depends_on = None
+
+
+# Built concurrently, outside a transaction, so venues and artists stay
+# writable while the indexes are built.
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_venues_genres",
+            "venues",
+            ["genres"],
+            unique=False,
+            postgresql_using="gin",
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_artists_genres",
+            "artists",
+            ["genres"],
+            unique=False,
+            postgresql_using="gin",
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_artists_genres", table_name="artists", postgresql_concurrently=True
+        )
+        op.drop_index(
+            "ix_venues_genres", table_name="venues", postgresql_concurrently=True
+        )
@@ -0,0 +1,48 @@
+"""matches between seeking artists and venues
+
+Revision ID: e8b27d915c04
+Revises: d41a6c3e8f52
+Create Date: 2022-09-13 11:05:36.184920
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "e8b27d915c04"
+down_revision = "d41a6c3e8f52"
+branch_labels = None
+depends_on = None
+
+
+# The table starts empty: fill it with `flask build-matches`.
+def upgrade():
+    op.create_table(
+        "matches",
+        sa.Column("artist_id", sa.Integer(), nullable=False),
+        sa.Column("venue_id", sa.Integer(), nullable=False),
+        sa.Column("shared_genres", sa.ARRAY(sa.String()), nullable=False),
+        sa.Column("score", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["artist_id"], ["artists.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["venue_id"], ["venues.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("artist_id", "venue_id"),
+    )
+    op.create_index(
+        "ix_matches_artist_id_score",
+        "matches",
+        ["artist_id", sa.text("score DESC"), "venue_id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_matches_venue_id_score",
+        "matches",
+        ["venue_id", sa.text("score DESC"), "artist_id"],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index("ix_matches_venue_id_score", table_name="matches")
+    op.drop_index("ix_matches_artist_id_score", table_name="matches")
+    op.drop_table("matches")
@@ -0,0 +1,132 @@
+"""partition shows by month of start_time
+
+Revision ID: f5c3a9d1b7e6
+Revises: e8b27d915c04
+Create Date: 2022-09-16 09:48:12.775031
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "f5c3a9d1b7e6"
+down_revision = "e8b27d915c04"
+branch_labels = None
+depends_on = None
+
+
+# shows is rebuilt as a table partitioned by RANGE (start_time): one
+# partition per month from the earliest show to three months ahead, and a
+# default partition for anything outside them. The rows are copied in this
+# transaction, so shows is locked against writes until it commits. Keep
+# partitions ahead with `flask partition-shows`.
+def upgrade():
+    op.execute("ALTER TABLE shows RENAME TO shows_unpartitioned")
+    op.execute(
+        "ALTER TABLE shows_unpartitioned "
+        "RENAME CONSTRAINT shows_pkey TO shows_unpartitioned_pkey"
+    )
+    op.drop_index("ix_shows_start_time_id", table_name="shows_unpartitioned")
+    op.drop_index("ix_shows_artist_id_start_time", table_name="shows_unpartitioned")
+    op.drop_index("ix_shows_venue_id_start_time", table_name="shows_unpartitioned")
+
+    op.execute("""
+        CREATE TABLE shows (
+            id integer NOT NULL DEFAULT nextval('shows_id_seq'),
+            venue_id integer NOT NULL REFERENCES venues (id),
+            artist_id integer NOT NULL REFERENCES artists (id),
+            start_time timestamp without time zone NOT NULL,
+            PRIMARY KEY (id, start_time)
+        ) PARTITION BY RANGE (start_time)
+    """)
+    op.execute("ALTER SEQUENCE shows_id_seq OWNED BY shows.id")
+    op.execute("CREATE TABLE shows_default PARTITION OF shows DEFAULT")
+    op.execute("""
+        DO $$
+        DECLARE
+            month date;
+        BEGIN
+            FOR month IN
+                SELECT generate_series(
+                    date_trunc('month', coalesce(min(start_time), now())),
+                    date_trunc('month', now()) + interval '3 months',
+                    interval '1 month'
+                )::date
+                FROM shows_unpartitioned
+            LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF shows FOR VALUES FROM (%L) TO (%L)',
+                    'shows_' || to_char(month, 'YYYY_MM'),
+                    month,
+                    month + interval '1 month'
+                );
+            END LOOP;
+        END
+        $$
+    """)
+    op.execute("""
+        INSERT INTO shows (id, venue_id, artist_id, start_time)
+        SELECT id, venue_id, artist_id, start_time FROM shows_unpartitioned
+    """)
+    op.drop_table("shows_unpartitioned")
+
+    op.create_index(
+        "ix_shows_venue_id_start_time",
+        "shows",
+        ["venue_id", "start_time"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_shows_artist_id_start_time",
+        "shows",
+        ["artist_id", "start_time"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_shows_start_time_id", "shows", ["start_time", "id"], unique=False
+    )
+    op.execute("ANALYZE shows")
+
+
+def downgrade():
+    op.execute("ALTER TABLE shows RENAME TO shows_partitioned")
+    op.execute(
+        "ALTER TABLE shows_partitioned "
+        "RENAME CONSTRAINT shows_pkey TO shows_partitioned_pkey"
+    )
+    op.drop_index("ix_shows_start_time_id", table_name="shows_partitioned")
+    op.drop_index("ix_shows_artist_id_start_time", table_name="shows_partitioned")
+    op.drop_index("ix_shows_venue_id_start_time", table_name="shows_partitioned")
+
+    op.execute("""
+        CREATE TABLE shows (
+            id integer NOT NULL DEFAULT nextval('shows_id_seq'),
+            venue_id integer NOT NULL REFERENCES venues (id),
+            artist_id integer NOT NULL REFERENCES artists (id),
+            start_time timestamp without time zone NOT NULL,
+            PRIMARY KEY (id)
+        )
+    """)
+    op.execute("ALTER SEQUENCE shows_id_seq OWNED BY shows.id")
+    op.execute("""
+        INSERT INTO shows (id, venue_id, artist_id, start_time)
+        SELECT id, venue_id, artist_id, start_time FROM shows_partitioned
+    """)
+    # Drops every attached partition with it; archived ones are left alone.
+    op.drop_table("shows_partitioned")
+
+    op.create_index(
+        "ix_shows_venue_id_start_time",
+        "shows",
+        ["venue_id", "start_time"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_shows_artist_id_start_time",
+        "shows",
+        ["artist_id", "start_time"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_shows_start_time_id", "shows", ["start_time", "id"], unique=False
+    )
@@ -1,20 +1,149 @@
+import random
+import threading
+import time
+
+from flask import g, has_app_context, request, session
 from sqlalchemy import Column, String, Integer, Boolean, DateTime, ARRAY, ForeignKey
-from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import DDL, create_engine, event, orm
+from flask_sqlalchemy import SQLAlchemy, SignallingSession
 from flask_migrate import Migrate
 
-db = SQLAlchemy()
+from instrumentation import init_query_instrumentation
+from metrics import init_metrics
+from slow_queries import slow_query_log
+
+
+class ReplicaSet:
+    """Read-only engines for SQLALCHEMY_REPLICA_URIS, created on first use.
+
+    Engines are built lazily so each worker process opens its own pools
+    after forking.
+    """
+
+    def __init__(self, uris, engine_options):
+        self.uris = list(uris)
+        self.engine_options = engine_options
+        self._engines = None
+        self._lock = threading.Lock()
+
+    @property
+    def engines(self):
+        if self._engines is None:
+            with self._lock:
+                if self._engines is None:
+                    self._engines = [
+                        create_engine(uri, **self.engine_options) for uri in self.uris
+                    ]
+        return self._engines
+
+    def choose(self):
+        return random.choice(self.engines) if self.uris else None
+
+    def dispose(self):
+        for engine in self._engines or []:
+            engine.dispose()
+
+
+class RoutingSession(SignallingSession):
+    """Sends a request's reads to the replica chosen in route_reads().
+
+    Anything flushed goes to the primary, as does everything outside a
+    request or in a request routed to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None):
+        if not self._flushing and has_app_context():
+            replica = g.get("db_replica")
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper, clause)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+
+db = RoutingSQLAlchemy()
+
 
+def init_read_routing(app, replica_uris):
+    replicas = ReplicaSet(replica_uris, app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}))
+    app.extensions["db_replicas"] = replicas
+    if not replicas.uris:
+        return
 
-def db_setup(app):
-    app.config.from_object("config")
-    db.app = app
+    def is_read_only():
+        return (
+            request.method in ("GET", "HEAD")
+            or request.endpoint in app.config["READ_ONLY_ENDPOINTS"]
+        )
+
+    @app.before_request
+    def route_reads():
+        # Reads go to a replica except for a short while after this client
+        # wrote, so the redirect that follows an edit shows the edit even
+        # if the replica is lagging.
+        if is_read_only() and session.get("primary_until", 0) < time.time():
+            g.db_replica = replicas.choose()
+
+    @app.after_request
+    def stick_to_primary(response):
+        if request.method != "OPTIONS" and not is_read_only():
+            session["primary_until"] = (
+                time.time() + app.config["READ_YOUR_WRITES_SECONDS"]
+            )
+        return response
+
+
+def db_setup(app, replica_uris=None):
+    init_metrics(app)
     db.init_app(app)
     migrate = Migrate(app, db)
+    if replica_uris is None:
+        replica_uris = app.config["SQLALCHEMY_REPLICA_URIS"]
+    init_read_routing(app, replica_uris)
+    init_query_instrumentation(app)
+    slow_query_log.init_app(app)
     return db
 
 
+# The genres a venue or artist can be listed under, in display order.
+GENRES = [
+    "Alternative",
+    "Blues",
+    "Classical",
+    "Country",
+    "Electronic",
+    "Folk",
+    "Funk",
+    "Hip-Hop",
+    "Heavy Metal",
+    "Instrumental",
+    "Jazz",
+    "Musical Theatre",
+    "Pop",
+    "Punk",
+    "R&B",
+    "Reggae",
+    "Rock n Roll",
+    "Soul",
+    "Other",
+]
+
+
 class Venue(db.Model):
     __tablename__ = "venues"
+    __table_args__ = (
+        db.Index(
+            "ix_venues_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+        # Genre filters (@> and &&) and facet counts.
+        db.Index("ix_venues_genres", "genres", postgresql_using="gin"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String, nullable=False)
@@ -30,7 +159,7 @@ class Venue(db.Model):
     website_link = db.Column(db.String(120), default="")
     looking_for_talent = db.Column(db.Boolean, default=False)
     seeking_description = db.Column(db.String(500), default="")
-    shows = db.relationship("Show", backref="venue", lazy=True)
+    shows = db.relationship("Show", backref="venue", lazy=True, passive_deletes=True)
 
     def __repr__(self):
         return f"<Venue {self.id} name: {self.name}>"
@@ -38,6 +167,15 @@ class Venue(db.Model):
 
 class Artist(db.Model):
     __tablename__ = "artists"
+    __table_args__ = (
+        db.Index(
+            "ix_artists_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+        db.Index("ix_artists_genres", "genres", postgresql_using="gin"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String, nullable=False)
@@ -53,7 +191,7 @@ class Artist(db.Model):
     looking_for_venue = db.Column(db.Boolean, default=False)
     seeking_description = db.Column(db.String(500), default="")
 
-    shows = db.relationship("Show", backref="artist", lazy=True)
+    shows = db.relationship("Show", backref="artist", lazy=True, passive_deletes=True)
 
     def __repr__(self):
         return f"<Artist {self.id} name: {self.name}>"
@@ -63,12 +201,66 @@ class Artist(db.Model):
 
 
 class Show(db.Model):
+    # Partitioned by month of start_time (see partitions.py), so upcoming
+    # shows are read from the few newest partitions. The partition key must
+    # be part of the primary key; the ORM still identifies shows by id.
     __tablename__ = "shows"
+    __table_args__ = (
+        db.Index("ix_shows_venue_id_start_time", "venue_id", "start_time"),
+        db.Index("ix_shows_artist_id_start_time", "artist_id", "start_time"),
+        db.Index("ix_shows_start_time_id", "start_time", "id"),
+        {"postgresql_partition_by": "RANGE (start_time)"},
+    )
 
-    id = db.Column(db.Integer, primary_key=True)
-    venue_id = db.Column(db.Integer, db.ForeignKey("venues.id"), nullable=False)
-    artist_id = db.Column(db.Integer, db.ForeignKey("artists.id"), nullable=False)
-    start_time = db.Column(db.DateTime, nullable=False)
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    venue_id = db.Column(
+        db.Integer, db.ForeignKey("venues.id", ondelete="CASCADE"), nullable=False
+    )
+    artist_id = db.Column(
+        db.Integer, db.ForeignKey("artists.id", ondelete="CASCADE"), nullable=False
+    )
+    start_time = db.Column(db.DateTime, primary_key=True)
+
+    __mapper_args__ = {"primary_key": [id]}
 
     def __repr__(self):
         return f"<Show {self.id}, Artist {self.artist_id}, Venue {self.venue_id}>"
+
+
+# Tables made by create_all() (rather than the migrations) need somewhere
+# for rows to go until `flask partition-shows` adds the monthly partitions.
+event.listen(
+    Show.__table__,
+    "after_create",
+    DDL("CREATE TABLE shows_default PARTITION OF shows DEFAULT"),
+)
+
+
+class Match(db.Model):
+    """A seeking artist and a seeking venue that share a genre.
+
+    Precomputed by matchmaking.py, so a profile's best matches are one
+    index range scan.
+    """
+
+    __tablename__ = "matches"
+    __table_args__ = (
+        db.Index(
+            "ix_matches_artist_id_score", "artist_id", db.text("score DESC"), "venue_id"
+        ),
+        db.Index(
+            "ix_matches_venue_id_score", "venue_id", db.text("score DESC"), "artist_id"
+        ),
+    )
+
+    artist_id = db.Column(
+        db.Integer, db.ForeignKey("artists.id", ondelete="CASCADE"), primary_key=True
+    )
+    venue_id = db.Column(
+        db.Integer, db.ForeignKey("venues.id", ondelete="CASCADE"), primary_key=True
+    )
+    shared_genres = db.Column(db.ARRAY(db.String()), nullable=False)
+    score = db.Column(db.Integer, nullable=False)
+
+    def __repr__(self):
+        return f"<Match Artist {self.artist_id}, Venue {self.venue_id}: {self.score}>"
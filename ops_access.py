@@ -0,0 +1,33 @@
+import hmac
+from functools import wraps
+
+from flask import abort, current_app, request
+
+
+def ops_request_allowed():
+    """Whether the request may read the operational endpoints.
+
+    That is a request from one of OPS_ALLOWED_IPS, or one sent with
+    "Authorization: Bearer <OPS_TOKEN>".
+    """
+    if request.remote_addr in current_app.config.get("OPS_ALLOWED_IPS", ()):
+        return True
+    token = current_app.config.get("OPS_TOKEN")
+    if not token:
+        return False
+    return hmac.compare_digest(
+        request.headers.get("Authorization", "").encode(),
+        f"Bearer {token}".encode(),
+    )
+
+
+def ops_only(view):
+    """Answer 404 to requests ops_request_allowed() turns down."""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not ops_request_allowed():
+            abort(404)
+        return view(*args, **kwargs)
+
+    return wrapper
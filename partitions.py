@@ -0,0 +1,158 @@
+import re
+from datetime import date
+
+from sqlalchemy import text
+
+# shows is partitioned by RANGE (start_time), one partition per month named
+# shows_YYYY_MM, plus shows_default for rows no monthly partition covers.
+DEFAULT_PARTITION = "shows_default"
+ARCHIVE_SCHEMA = "archive"
+_MONTHLY = re.compile(r"^shows_(\d{4})_(\d{2})$")
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f"shows_{month:%Y_%m}"
+
+
+def monthly_partitions(conn):
+    """The first day of each month that has a partition attached to shows."""
+    names = conn.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = 'shows'::regclass"
+        )
+    ).scalars()
+    months = []
+    for name in names:
+        match = _MONTHLY.match(name)
+        if match:
+            months.append(date(int(match.group(1)), int(match.group(2)), 1))
+    return sorted(months)
+
+
+def create_partition(conn, month):
+    """Attach the partition for ``month``.
+
+    Shows of that month that went to the default partition are moved into
+    it first, as Postgres refuses to attach a range the default still has
+    rows for.
+    """
+    name = partition_name(month)
+    bounds = {"start": month, "end": add_months(month, 1)}
+    conn.execute(
+        text(
+            f"CREATE TABLE {name} (LIKE shows INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        )
+    )
+    conn.execute(
+        text(
+            f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+            "WHERE start_time >= :start AND start_time < :end RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved"
+        ),
+        bounds,
+    )
+    conn.execute(
+        text(
+            f"ALTER TABLE shows ATTACH PARTITION {name} "
+            f"FOR VALUES FROM ('{bounds['start']}') TO ('{bounds['end']}')"
+        )
+    )
+    return name
+
+
+def ensure_partitions(conn, today, ahead=3):
+    """Create the partitions shows needs; returns the names created.
+
+    That is one for this month and each of the ``ahead`` following ones,
+    plus one for each month that has rows in the default partition.
+    """
+    this_month = month_start(today)
+    wanted = {add_months(this_month, i) for i in range(ahead + 1)}
+    wanted.update(
+        month_start(value)
+        for value in conn.execute(
+            text(
+                "SELECT DISTINCT date_trunc('month', start_time) "
+                f"FROM {DEFAULT_PARTITION}"
+            )
+        ).scalars()
+    )
+    existing = set(monthly_partitions(conn))
+    return [create_partition(conn, month) for month in sorted(wanted - existing)]
+
+
+def archive_partitions(conn, before):
+    """Detach the partitions of months before ``before``; returns their names.
+
+    Detached partitions are moved to the archive schema: their shows no
+    longer appear on any page, but stay queryable there. They keep the
+    venue_id of venues deleted later.
+    """
+    archived = []
+    for month in monthly_partitions(conn):
+        if month >= month_start(before):
+            break
+        name = partition_name(month)
+        conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}"))
+        conn.execute(text(f"ALTER TABLE shows DETACH PARTITION {name}"))
+        conn.execute(text(f"ALTER TABLE {name} SET SCHEMA {ARCHIVE_SCHEMA}"))
+        # Nothing is inserted into an archive, and the default would tie the
+        # table to shows' id sequence.
+        conn.execute(
+            text(f"ALTER TABLE {ARCHIVE_SCHEMA}.{name} ALTER COLUMN id DROP DEFAULT")
+        )
+        archived.append(name)
+    drop_archive_foreign_keys(conn)
+    return archived
+
+
+def archived_ids(conn, names):
+    """The venue ids and artist ids with shows in the archived ``names``."""
+    venue_ids, artist_ids = set(), set()
+    for name in names:
+        venue_ids.update(
+            conn.execute(
+                text(f"SELECT DISTINCT venue_id FROM {ARCHIVE_SCHEMA}.{name}")
+            ).scalars()
+        )
+        artist_ids.update(
+            conn.execute(
+                text(f"SELECT DISTINCT artist_id FROM {ARCHIVE_SCHEMA}.{name}")
+            ).scalars()
+        )
+    return venue_ids, artist_ids
+
+
+def drop_archive_foreign_keys(conn):
+    """Drop the foreign keys archived partitions kept from shows.
+
+    A detached partition keeps its own copy of shows' foreign keys to venues
+    and artists, which would make deleting a venue with archived shows fail
+    (or, were they cascading, delete the record of what it hosted). Returns
+    the names of the constraints dropped.
+    """
+    constraints = conn.execute(
+        text(
+            "SELECT c.relname, con.conname FROM pg_constraint con "
+            "JOIN pg_class c ON c.oid = con.conrelid "
+            "JOIN pg_namespace n ON n.oid = c.relnamespace "
+            "WHERE n.nspname = :schema AND con.contype = 'f'"
+        ),
+        {"schema": ARCHIVE_SCHEMA},
+    ).all()
+    for table, constraint in constraints:
+        conn.execute(
+            text(f'ALTER TABLE {ARCHIVE_SCHEMA}.{table} DROP CONSTRAINT "{constraint}"')
+        )
+    return [constraint for _, constraint in constraints]
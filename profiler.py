@@ -0,0 +1,147 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from urllib.parse import parse_qs
+
+from werkzeug.wsgi import ClosingIterator
+
+# Each sample is filed under the innermost frame that matches one of these,
+# so a query run from a template filter counts as sqlalchemy, and Babel
+# called from a template counts as babel.
+CATEGORIES = [
+    ("sqlalchemy", ("/sqlalchemy/", "/psycopg2/", "/asyncpg/", "async_reads.py")),
+    ("babel", ("/babel/", "/dateutil/")),
+    ("wtforms", ("/wtforms/", "/flask_wtf/", "forms.py")),
+    ("jinja", ("/jinja2/", ".html")),
+]
+# Set in the WSGI environ of a profiled request, so the response cache
+# lets the view run.
+PROFILED = "fyyur.profiled"
+
+# format_datetime is where the app hands over to Babel.
+CATEGORY_FUNCTIONS = {
+    "format_datetime": "babel",
+    "_format_datetime": "babel",
+    "_datetime_pattern": "babel",
+}
+
+
+def _category(frame):
+    name = CATEGORY_FUNCTIONS.get(frame.f_code.co_name)
+    if name:
+        return name
+    filename = frame.f_code.co_filename
+    for name, markers in CATEGORIES:
+        if any(marker in filename for marker in markers):
+            return name
+    return None
+
+
+def _fold(frame):
+    """The stack of ``frame`` as a collapsed line: "category;outer;...;inner"."""
+    names = []
+    category = None
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)})")
+        category = category or _category(frame)
+        frame = frame.f_back
+    names.append(category or "app")
+    return ";".join(reversed(names))
+
+
+class _Sampler(threading.Thread):
+    def __init__(self, thread_id, interval):
+        super().__init__(name="request-profiler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.done = threading.Event()
+
+    def run(self):
+        while not self.done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[_fold(frame)] += 1
+
+
+class SamplingProfiler:
+    """WSGI middleware that samples the stack of one requested request.
+
+    A request is profiled when it carries an ``X-Profile`` header or a
+    ``_profile`` query parameter equal to PROFILER_TOKEN. Its stack is
+    sampled every PROFILER_INTERVAL_MS until the response has been sent,
+    and the samples are written to PROFILER_DIR as collapsed stacks, the
+    input of flamegraph.pl and speedscope. The first frame of each stack is
+    the category the sample is counted under: sqlalchemy, jinja, babel,
+    wtforms or app.
+    """
+
+    def __init__(self, wsgi_app, app):
+        self.wsgi_app = wsgi_app
+        self.app = app
+        self.token = app.config["PROFILER_TOKEN"]
+        self.interval = app.config.get("PROFILER_INTERVAL_MS", 1) / 1000
+        self.directory = app.config["PROFILER_DIR"]
+
+    def _requested(self, environ):
+        value = environ.get("HTTP_X_PROFILE")
+        if value is None:
+            value = parse_qs(environ.get("QUERY_STRING", "")).get("_profile", [None])[0]
+        return value is not None and value == self.token
+
+    def __call__(self, environ, start_response):
+        if not self._requested(environ):
+            return self.wsgi_app(environ, start_response)
+
+        environ[PROFILED] = True
+        os.makedirs(self.directory, exist_ok=True)
+        slug = environ.get("PATH_INFO", "").strip("/").replace("/", "_") or "index"
+        filename = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{slug}.folded"
+
+        def profiled_start_response(status, headers, exc_info=None):
+            headers.append(("X-Profile", filename))
+            return start_response(status, headers, exc_info)
+
+        sampler = _Sampler(threading.get_ident(), self.interval)
+        started = time.perf_counter()
+        sampler.start()
+
+        def finish():
+            sampler.done.set()
+            sampler.join()
+            self._write(filename, sampler.stacks, time.perf_counter() - started)
+
+        try:
+            app_iter = self.wsgi_app(environ, profiled_start_response)
+        except BaseException:
+            finish()
+            raise
+        return ClosingIterator(app_iter, [finish])
+
+    def _write(self, filename, stacks, elapsed):
+        with open(os.path.join(self.directory, filename), "w") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        totals = Counter()
+        for stack, count in stacks.items():
+            totals[stack.split(";", 1)[0]] += count
+        samples = sum(totals.values()) or 1
+        self.app.logger.info(
+            "Profiled %s in %.1f ms (%d samples): %s",
+            filename,
+            elapsed * 1000,
+            samples,
+            ", ".join(
+                f"{name} {count * 100 / samples:.0f}%"
+                for name, count in totals.most_common()
+            ),
+        )
+
+
+def init_profiler(app):
+    if app.config.get("PROFILER_ENABLED") and app.config.get("PROFILER_TOKEN"):
+        app.wsgi_app = SamplingProfiler(app.wsgi_app, app)
@@ -0,0 +1,485 @@
+from datetime import datetime
+
+from sqlalchemy import (
+    ARRAY,
+    Integer,
+    String,
+    and_,
+    any_,
+    false,
+    func,
+    literal,
+    select,
+    true,
+    tuple_,
+    type_coerce,
+    union_all,
+)
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+
+from models import db, Venue, Artist, Show
+
+# Rows fetched per round-trip when a listing is streamed.
+STREAM_CHUNK_SIZE = 500
+
+
+def stream(statement, chunk_size=STREAM_CHUNK_SIZE):
+    """Yield the rows of ``statement`` from a server-side cursor.
+
+    Only ``chunk_size`` rows are held in memory at a time.
+    """
+    result = db.session.execute(statement.execution_options(stream_results=True))
+    try:
+        yield from result.yield_per(chunk_size)
+    finally:
+        result.close()
+
+
+def genre_filter(column, genres, match="all"):
+    """Rows whose ``column`` holds all of ``genres``, or any with match="any".
+
+    Both (@> and &&) are answered from the GIN index on the column. The
+    Postgres ARRAY type provides the operators and sends ``genres`` as
+    varchar[], the column's type, which the index needs.
+    """
+    column = type_coerce(column, postgresql.ARRAY(String))
+    if match == "any":
+        return column.overlap(genres)
+    return column.contains(genres)
+
+
+def genre_facets(model, genres=None, match="all"):
+    """genre -> number of ``model`` rows listed under it, in one query.
+
+    With ``genres``, only the rows matching genre_filter() are counted.
+    """
+    statement = select(func.unnest(model.genres).label("genre"))
+    if genres:
+        statement = statement.where(genre_filter(model.genres, genres, match))
+    per_row = statement.subquery()
+    rows = db.session.execute(
+        select(per_row.c.genre, func.count()).group_by(per_row.c.genre)
+    )
+    return dict(rows.all())
+
+
+def venue_areas_statement(now=None, genres=None, match="all"):
+    """Venues grouped by (city, state), each with its upcoming show count.
+
+    Everything is aggregated in a single query, so the number of round-trips
+    does not depend on how many venues or areas there are.
+    """
+    now = now or datetime.now()
+
+    per_venue = select(
+        Venue.id,
+        Venue.name,
+        Venue.city,
+        Venue.state,
+        func.count(Show.id).label("num_upcoming_shows"),
+    ).outerjoin(Show, and_(Show.venue_id == Venue.id, Show.start_time > now))
+    if genres:
+        per_venue = per_venue.where(genre_filter(Venue.genres, genres, match))
+    per_venue = per_venue.group_by(Venue.id).subquery()
+
+    venue_json = func.json_build_object(
+        "id",
+        per_venue.c.id,
+        "name",
+        per_venue.c.name,
+        "num_upcoming_shows",
+        per_venue.c.num_upcoming_shows,
+    )
+    return (
+        select(
+            per_venue.c.city,
+            per_venue.c.state,
+            func.json_agg(aggregate_order_by(venue_json, per_venue.c.name)).label(
+                "venues"
+            ),
+        )
+        .group_by(per_venue.c.state, per_venue.c.city)
+        .order_by(per_venue.c.state, per_venue.c.city)
+    )
+
+
+def iter_venue_areas(now=None, genres=None, match="all"):
+    """venue_areas(), one area at a time from a server-side cursor."""
+    for row in stream(venue_areas_statement(now, genres, match)):
+        yield {"city": row.city, "state": row.state, "venues": row.venues}
+
+
+def venue_areas(now=None, genres=None, match="all"):
+    return list(iter_venue_areas(now, genres, match))
+
+
+def iter_artists(genres=None, match="all"):
+    """Every artist's id and name, from a server-side cursor."""
+    statement = select(Artist.id, Artist.name).order_by(Artist.id)
+    if genres:
+        statement = statement.where(genre_filter(Artist.genres, genres, match))
+    for row in stream(statement):
+        yield {"id": row.id, "name": row.name}
+
+
+def _upcoming_show_counts(fk_column, ids, now):
+    if not ids:
+        return {}
+    rows = (
+        db.session.query(fk_column, func.count(Show.id))
+        .filter(fk_column.in_(ids), Show.start_time > now)
+        .group_by(fk_column)
+        .all()
+    )
+    return dict(rows)
+
+
+# Terms shorter than a trigram have no trigrams of their own to rank by.
+MIN_RANKED_TERM = 3
+
+
+def _like_escape(term):
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _search(model, fk_column, term, page, per_page, now=None):
+    now = now or datetime.now()
+    page = max(page, 1)
+
+    # The ILIKE filter is answered by the trigram index on name; similarity()
+    # ranks the closest names first. % and _ in the term match themselves.
+    order = [model.name, model.id]
+    if len(term) >= MIN_RANKED_TERM:
+        order.insert(0, func.similarity(model.name, term).desc())
+    rows = (
+        db.session.query(model.id, model.name, func.count().over().label("total"))
+        .filter(model.name.ilike(f"%{_like_escape(term)}%", escape="\\"))
+        .order_by(*order)
+        .limit(per_page)
+        .offset((page - 1) * per_page)
+        .all()
+    )
+
+    counts = _upcoming_show_counts(fk_column, [row.id for row in rows], now)
+    total = rows[0].total if rows else 0
+    return {
+        "count": total,
+        "data": [
+            {
+                "id": row.id,
+                "name": row.name,
+                "num_upcoming_shows": counts.get(row.id, 0),
+            }
+            for row in rows
+        ],
+        "page": page,
+        "has_prev": page > 1,
+        "has_next": page * per_page < total,
+    }
+
+
+def venue_search_page(term, page=1, per_page=20):
+    return _search(Venue, Show.venue_id, term, page, per_page)
+
+
+def artist_search_page(term, page=1, per_page=20):
+    return _search(Artist, Show.artist_id, term, page, per_page)
+
+
+def recent_statement(model, limit=10):
+    """The ``limit`` most recently listed venues or artists (id and name)."""
+    return select(model.id, model.name).order_by(model.id.desc()).limit(limit)
+
+
+def detail_statement(model, entity_id, columns=None):
+    """One venue or artist: ``columns`` of it, or every column by default."""
+    if columns is None:
+        return select(model.__table__).where(model.id == entity_id)
+    return select(*columns).where(model.id == entity_id)
+
+
+def batch_statement(model, ids, columns, fk_column=None, now=None):
+    """``columns`` of every venue or artist in ``ids``, in one query.
+
+    The ids are sent as a single array parameter (``id = ANY(:ids)``), so
+    the statement is the same however many are asked for. With
+    ``fk_column`` each row also has its ``num_upcoming_shows``.
+    """
+    columns = list(columns)
+    if fk_column is not None:
+        columns.append(
+            select(func.count(Show.id))
+            .where(fk_column == model.id, Show.start_time > (now or datetime.now()))
+            .scalar_subquery()
+            .label("num_upcoming_shows")
+        )
+    return select(*columns).where(model.id == any_(literal(ids, ARRAY(Integer))))
+
+
+def id_page(columns, id_column, after=None, per_page=50):
+    """One page of rows in id order, keyset-paginated on ``id_column``.
+
+    Returns the rows and whether there is a next page.
+    """
+    statement = select(*columns).order_by(id_column).limit(per_page + 1)
+    if after is not None:
+        statement = statement.where(id_column > after)
+    rows = db.session.execute(statement).all()
+    return rows[:per_page], len(rows) > per_page
+
+
+# Past shows on a venue or artist page, and per "load more" request.
+PAST_SHOWS_PER_PAGE = 10
+
+
+def _show_item(row, prefix):
+    return {
+        f"{prefix}_id": row.id,
+        f"{prefix}_name": row.name,
+        f"{prefix}_image_link": row.image_link,
+        "start_time": row.start_time,
+    }
+
+
+def _partitioned_shows_statement(
+    fk_column, entity_id, counterpart, counterpart_fk, now, past_limit
+):
+    # Every upcoming show, but only the latest ``past_limit`` past ones: a
+    # long-running venue may have thousands. Both halves are read from the
+    # (fk, start_time) index, and the counterpart is joined to those rows
+    # only. The past count comes from the same index without reading rows.
+    def shows(*where):
+        return select(
+            Show.id.label("show_id"),
+            Show.start_time,
+            counterpart_fk.label("counterpart_id"),
+        ).where(fk_column == entity_id, *where)
+
+    upcoming = shows(Show.start_time > now).add_columns(true().label("upcoming"))
+    past = (
+        shows(Show.start_time <= now)
+        .add_columns(false().label("upcoming"))
+        .order_by(Show.start_time.desc(), Show.id.desc())
+        .limit(past_limit)
+        .subquery()
+    )
+    both = union_all(upcoming, select(past)).subquery()
+    past_count = (
+        select(func.count())
+        .select_from(Show)
+        .where(fk_column == entity_id, Show.start_time <= now)
+        .scalar_subquery()
+    )
+    return (
+        select(
+            counterpart.id,
+            counterpart.name,
+            counterpart.image_link,
+            both.c.show_id,
+            both.c.start_time,
+            both.c.upcoming,
+            past_count.label("past_shows_count"),
+        )
+        .join_from(both, counterpart, both.c.counterpart_id == counterpart.id)
+        .order_by(both.c.start_time, both.c.show_id)
+    )
+
+
+def partition_shows(rows, prefix):
+    """Split rows of a ``*_shows_statement`` into past and upcoming shows.
+
+    Upcoming shows are soonest first and past shows latest first. When
+    there are more past shows than were fetched, ``past_shows_next_cursor``
+    continues from the oldest one (see venue_past_shows()).
+    """
+    result = {
+        "past_shows": [],
+        "upcoming_shows": [],
+        "past_shows_count": 0,
+        "upcoming_shows_count": 0,
+        "past_shows_next_cursor": None,
+    }
+    oldest = None
+    for row in rows:
+        bucket = "upcoming_shows" if row.upcoming else "past_shows"
+        result[bucket].append(_show_item(row, prefix))
+        result["past_shows_count"] = row.past_shows_count
+        if oldest is None and not row.upcoming:
+            oldest = row
+    result["past_shows"].reverse()
+    result["upcoming_shows_count"] = len(result["upcoming_shows"])
+    if result["past_shows_count"] > len(result["past_shows"]):
+        result["past_shows_next_cursor"] = encode_show_cursor(
+            oldest.start_time, oldest.show_id
+        )
+    return result
+
+
+def venue_shows_statement(venue_id, now=None, past_limit=PAST_SHOWS_PER_PAGE):
+    return _partitioned_shows_statement(
+        Show.venue_id,
+        venue_id,
+        Artist,
+        Show.artist_id,
+        now or datetime.now(),
+        past_limit,
+    )
+
+
+def artist_shows_statement(artist_id, now=None, past_limit=PAST_SHOWS_PER_PAGE):
+    return _partitioned_shows_statement(
+        Show.artist_id,
+        artist_id,
+        Venue,
+        Show.venue_id,
+        now or datetime.now(),
+        past_limit,
+    )
+
+
+def _past_shows_page(
+    fk_column, entity_id, counterpart, counterpart_fk, prefix, after, per_page, now
+):
+    statement = (
+        select(
+            counterpart.id,
+            counterpart.name,
+            counterpart.image_link,
+            Show.id.label("show_id"),
+            Show.start_time,
+        )
+        .join_from(Show, counterpart, counterpart_fk == counterpart.id)
+        .where(fk_column == entity_id, Show.start_time <= now)
+        .order_by(Show.start_time.desc(), Show.id.desc())
+        .limit(per_page + 1)
+    )
+    if after is not None:
+        statement = statement.where(
+            tuple_(Show.start_time, Show.id) < tuple_(*decode_show_cursor(after))
+        )
+    rows = db.session.execute(statement).all()
+    next_cursor = None
+    if len(rows) > per_page:
+        last = rows[per_page - 1]
+        next_cursor = encode_show_cursor(last.start_time, last.show_id)
+    return [_show_item(row, prefix) for row in rows[:per_page]], next_cursor
+
+
+def venue_past_shows(venue_id, after=None, per_page=PAST_SHOWS_PER_PAGE, now=None):
+    """One page of a venue's past shows, latest first, in one query.
+
+    Keyset-paginated on (start_time, id): ``after`` is a cursor from
+    partition_shows() or an earlier page. Returns the shows and the cursor
+    of the next page, or None after the last one.
+    """
+    return _past_shows_page(
+        Show.venue_id,
+        venue_id,
+        Artist,
+        Show.artist_id,
+        "artist",
+        after,
+        per_page,
+        now or datetime.now(),
+    )
+
+
+def artist_past_shows(artist_id, after=None, per_page=PAST_SHOWS_PER_PAGE, now=None):
+    """venue_past_shows() for an artist, with the venue columns joined in."""
+    return _past_shows_page(
+        Show.artist_id,
+        artist_id,
+        Venue,
+        Show.venue_id,
+        "venue",
+        after,
+        per_page,
+        now or datetime.now(),
+    )
+
+
+def encode_show_cursor(start_time, show_id):
+    return f"{start_time.isoformat()}_{show_id}"
+
+
+def decode_show_cursor(cursor):
+    """Parse a cursor made by encode_show_cursor; raises ValueError if malformed."""
+    start_time, _, show_id = cursor.rpartition("_")
+    return datetime.fromisoformat(start_time), int(show_id)
+
+
+def show_page(after=None, before=None, per_page=30):
+    """One page of shows, newest first, keyset-paginated on (start_time, id).
+
+    ``after`` pages towards older shows and ``before`` towards newer ones;
+    both are cursors from encode_show_cursor.
+    """
+    key = tuple_(Show.start_time, Show.id)
+    query = (
+        db.session.query(
+            Show.id,
+            Show.start_time,
+            Show.venue_id,
+            Venue.name.label("venue_name"),
+            Show.artist_id,
+            Artist.name.label("artist_name"),
+            Artist.image_link.label("artist_image_link"),
+        )
+        .join(Venue, Show.venue_id == Venue.id)
+        .join(Artist, Show.artist_id == Artist.id)
+    )
+
+    if before is not None:
+        rows = (
+            query.filter(key > tuple_(*decode_show_cursor(before)))
+            .order_by(Show.start_time, Show.id)
+            .limit(per_page + 1)
+            .all()
+        )
+        has_prev, has_next = len(rows) > per_page, True
+        rows = rows[:per_page][::-1]
+    else:
+        if after is not None:
+            query = query.filter(key < tuple_(*decode_show_cursor(after)))
+        rows = (
+            query.order_by(Show.start_time.desc(), Show.id.desc())
+            .limit(per_page + 1)
+            .all()
+        )
+        has_prev, has_next = after is not None, len(rows) > per_page
+        rows = rows[:per_page]
+
+    return {
+        "shows": [
+            {
+                "venue_id": row.venue_id,
+                "venue_name": row.venue_name,
+                "artist_id": row.artist_id,
+                "artist_name": row.artist_name,
+                "artist_image_link": row.artist_image_link,
+                "start_time": row.start_time,
+            }
+            for row in rows
+        ],
+        "prev_cursor": (
+            encode_show_cursor(rows[0].start_time, rows[0].id)
+            if rows and has_prev
+            else None
+        ),
+        "next_cursor": (
+            encode_show_cursor(rows[-1].start_time, rows[-1].id)
+            if rows and has_next
+            else None
+        ),
+    }
+
+
+def artist_ids_for_venue(venue_id):
+    rows = db.session.query(Show.artist_id).filter_by(venue_id=venue_id).distinct()
+    return [artist_id for (artist_id,) in rows]
+
+
+def venue_ids_for_artist(artist_id):
+    rows = db.session.query(Show.venue_id).filter_by(artist_id=artist_id).distinct()
+    return [venue_id for (venue_id,) in rows]
@@ -0,0 +1,174 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from logging.handlers import WatchedFileHandler
+
+from flask import current_app, has_app_context, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# One handler per log file, shared by the apps that write to it.
+_handlers = {}
+_handlers_lock = threading.Lock()
+
+# EXPLAIN only accepts these; DDL and the like are logged without a plan.
+_EXPLAINABLE = re.compile(r"\s*(SELECT|INSERT|UPDATE|DELETE|VALUES|WITH)\b", re.I)
+
+
+def _handler(path):
+    with _handlers_lock:
+        handler = _handlers.get(path)
+        if handler is None:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Every worker appends to the same file, so none of them can
+            # rotate it; logrotate does, and each worker reopens the file
+            # once it has been moved.
+            handler = WatchedFileHandler(path)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            _handlers[path] = handler
+        return handler
+
+
+class _AppLog:
+    """One app's slow query settings, log file and EXPLAIN thread."""
+
+    def __init__(self, threshold, explain, max_pending, log_parameters, path):
+        self.threshold = threshold
+        self.explain = explain
+        self.max_pending = max_pending
+        self.log_parameters = log_parameters
+        self.logger = logging.Logger("fyyur.slow_queries", logging.INFO)
+        self.logger.addHandler(_handler(path))
+        self._executor = None
+        self._pid = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def _submit(self, fn, *args):
+        # The executor's thread does not survive a fork, so each worker
+        # starts its own.
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="slow-query-explain"
+                )
+                self._pid, self._pending = os.getpid(), 0
+            if self._pending >= self.max_pending:
+                return False
+            self._pending += 1
+        self._executor.submit(fn, *args)
+        return True
+
+    def record(self, engine, statement, parameters, duration, many):
+        entry = {
+            "time": datetime.now(timezone.utc).isoformat(),
+            "duration_ms": round(duration * 1000, 2),
+            "endpoint": request.endpoint if has_request_context() else None,
+            "path": request.path if has_request_context() else None,
+            "statement": " ".join(statement.split()),
+            "parameters": parameters if self.log_parameters else _redact(parameters),
+            "plan": None,
+        }
+        # Plans for executemany() batches would need one EXPLAIN per row,
+        # and async engines can only be driven from their event loop.
+        if (
+            self.explain
+            and not many
+            and _EXPLAINABLE.match(statement)
+            and not engine.dialect.is_async
+            and self._submit(
+                self._explain_and_write, engine, statement, parameters, entry
+            )
+        ):
+            return
+        self._write(entry)
+
+    def _explain_and_write(self, engine, statement, parameters, entry):
+        try:
+            with engine.connect() as conn:
+                entry["plan"] = conn.exec_driver_sql(
+                    "EXPLAIN (ANALYZE off, FORMAT JSON) " + statement,
+                    parameters,
+                ).scalar()
+        except Exception as e:
+            entry["plan_error"] = str(e)
+        finally:
+            with self._lock:
+                self._pending -= 1
+        self._write(entry)
+
+    def _write(self, entry):
+        self.logger.info(json.dumps(entry, default=str))
+
+
+class SlowQueryLog:
+    """Logs statements slower than SLOW_QUERY_THRESHOLD_MS as JSON lines.
+
+    Each line has the statement, its parameters, the endpoint that ran it
+    and, with SLOW_QUERY_EXPLAIN, its EXPLAIN plan. Parameter values are
+    what users typed into forms, so they are logged as "?" unless
+    SLOW_QUERY_LOG_PARAMETERS is set. Plans are fetched on a background
+    thread on a separate connection, so the request that ran the slow
+    statement does not wait for them.
+
+    Each app's settings and log file are kept in ``app.extensions``;
+    statements run outside an app context are not timed.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        threshold_ms = app.config.get("SLOW_QUERY_THRESHOLD_MS")
+        if threshold_ms is None:
+            return
+        app.extensions["slow_query_log"] = _AppLog(
+            threshold_ms / 1000,
+            app.config.get("SLOW_QUERY_EXPLAIN", True),
+            app.config.get("SLOW_QUERY_MAX_PENDING", 100),
+            app.config.get("SLOW_QUERY_LOG_PARAMETERS", False),
+            app.config["SLOW_QUERY_LOG"],
+        )
+        if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+            event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+            event.listen(Engine, "handle_error", _handle_error)
+
+
+def _redact(parameters):
+    if isinstance(parameters, dict):
+        return dict.fromkeys(parameters, "?")
+    if isinstance(parameters, (list, tuple)):
+        return [_redact(value) for value in parameters]
+    return "?"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, many):
+    conn.info.setdefault("slow_query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, many):
+    elapsed = time.perf_counter() - conn.info["slow_query_start_time"].pop()
+    log = current_app.extensions.get("slow_query_log") if has_app_context() else None
+    if (
+        log is not None
+        and elapsed >= log.threshold
+        and not statement.lstrip().upper().startswith("EXPLAIN")
+    ):
+        log.record(conn.engine, statement, parameters, elapsed, many)
+
+
+def _handle_error(context):
+    if context.connection is not None:
+        starts = context.connection.info.get("slow_query_start_time")
+        if starts:
+            starts.pop()
+
+
+slow_query_log = SlowQueryLog()
@@ -2,3 +2,14 @@ window.parseISOString = function parseISOString(s) {
   var b = s.split(/\D+/);
   return new Date(Date.UTC(b[0], --b[1], b[2], b[3], b[4], b[5], b[6]));
 };
+
+// "Load more" on venue and artist pages: the button is replaced by the next
+// page of past shows, which brings its own button if there are more.
+$(document).on("click", ".load-more button", function () {
+  var button = $(this).prop("disabled", true);
+  $.get(button.data("url"), function (html) {
+    button.parent().replaceWith(html);
+  }).fail(function () {
+    button.prop("disabled", false);
+  });
+});
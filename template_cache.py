@@ -0,0 +1,28 @@
+import os
+
+from jinja2 import FileSystemBytecodeCache
+
+
+def init_template_cache(app):
+    """Keep compiled templates in TEMPLATE_BYTECODE_CACHE_DIR.
+
+    Jinja checks each entry against the template's source, so a stale entry
+    is recompiled rather than used, and entries are written atomically, so
+    workers can share the directory.
+    """
+    directory = app.config.get("TEMPLATE_BYTECODE_CACHE_DIR")
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+
+
+def compile_templates(app):
+    """Compile every template into the bytecode cache.
+
+    The compiled templates are also kept in the app's environment, so
+    processes forked afterwards start with them loaded.
+    """
+    names = [name for name in app.jinja_env.list_templates() if name.endswith(".html")]
+    for name in names:
+        app.jinja_env.get_template(name)
+    return names
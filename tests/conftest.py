@@ -0,0 +1,116 @@
+import pytest
+from sqlalchemy import func, text
+from sqlalchemy.exc import DBAPIError
+
+from app import create_app
+from cache import LRUBackend
+from models import db, Artist, Venue
+
+
+@pytest.fixture
+def app():
+    """An app with TestingConfig: strict query budgets, no response cache.
+
+    Needs a migrated (and ideally seeded) database at DATABASE_URL. Tests
+    that write clean up after themselves, but use a scratch database.
+    """
+    app = create_app("testing")
+    with app.app_context():
+        try:
+            db.session.execute(text("SELECT 1 FROM shows LIMIT 1"))
+        except DBAPIError as e:
+            pytest.skip(f"needs a migrated database at DATABASE_URL: {e.orig}")
+        finally:
+            db.session.remove()
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def ids(app):
+    """The first venue and artist id, or 0 when there are none."""
+    with app.app_context():
+        ids = {
+            "venue_id": db.session.query(func.min(Venue.id)).scalar() or 0,
+            "artist_id": db.session.query(func.min(Artist.id)).scalar() or 0,
+        }
+        db.session.remove()
+    return ids
+
+
+@pytest.fixture
+def profiles(app):
+    """A fresh venue and artist, deleted again after the test."""
+    with app.app_context():
+        venue = Venue(
+            name="Fixture Test Hall",
+            city="Tulsa",
+            state="OK",
+            address="1 Test St",
+            phone="555-000-0000",
+            genres=["Jazz"],
+        )
+        artist = Artist(
+            name="Fixture Test Trio",
+            city="Tulsa",
+            state="OK",
+            phone="555-000-0001",
+            genres=["Jazz"],
+        )
+        db.session.add_all([venue, artist])
+        db.session.commit()
+        ids = {"venue_id": venue.id, "artist_id": artist.id}
+        db.session.remove()
+    yield ids
+    with app.app_context():
+        Venue.query.filter_by(id=ids["venue_id"]).delete()
+        Artist.query.filter_by(id=ids["artist_id"]).delete()
+        db.session.commit()
+        db.session.remove()
+
+
+@pytest.fixture
+def cache(app):
+    """Turn on an in-memory response cache for ``app``."""
+    app.extensions["response_cache"].backend = LRUBackend()
+
+
+@pytest.fixture
+def reader(app, cache):
+    """A second client, whose pages come from the cache unless invalidated.
+
+    A writer's own next page skips the cache to show its flash message, so
+    freshness after a write is checked from another client.
+    """
+    return app.test_client()
+
+
+@pytest.fixture
+def venue_form():
+    """Edit form data matching the ``profiles`` venue."""
+    return {
+        "name": "Fixture Test Hall",
+        "city": "Tulsa",
+        "state": "OK",
+        "address": "1 Test St",
+        "phone": "555-000-0000",
+        "genres": ["Jazz"],
+        "facebook_link": "https://www.facebook.com/fixture",
+    }
+
+
+@pytest.fixture
+def artist_form():
+    """Edit form data matching the ``profiles`` artist."""
+    return {
+        "name": "Fixture Test Trio",
+        "city": "Tulsa",
+        "state": "OK",
+        "phone": "555-000-0001",
+        "genres": ["Jazz"],
+        "facebook_link": "https://www.facebook.com/fixture",
+    }
@@ -0,0 +1,64 @@
+import pytest
+from sqlalchemy import func
+
+from api import MAX_ID
+from models import db, Venue
+
+
+def test_batch_reports_missing_ids(client, ids):
+    venue_id = ids["venue_id"]
+    response = client.get(f"/api/v1/venues/batch?ids={venue_id},{MAX_ID}")
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [venue["id"] for venue in body["data"]] == [venue_id]
+    assert body["missing"] == [MAX_ID]
+
+
+def test_batch_accepts_json_body(client, ids):
+    artist_id = ids["artist_id"]
+    response = client.post(
+        "/api/v1/artists/batch", json={"ids": [artist_id, artist_id, MAX_ID]}
+    )
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [artist["id"] for artist in body["data"]] == [artist_id]
+    assert body["missing"] == [MAX_ID]
+
+
+@pytest.mark.parametrize("value", [0, -1, MAX_ID + 1, 2**63])
+def test_batch_rejects_ids_outside_int4(client, value):
+    assert client.get(f"/api/v1/venues/batch?ids=1,{value}").status_code == 400
+    response = client.post("/api/v1/artists/batch", json={"ids": [1, value]})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("body", [[1, 2], {"ids": "1,2"}, {"ids": ["x"]}, {"ids": []}])
+def test_batch_rejects_malformed_bodies(client, body):
+    assert client.post("/api/v1/venues/batch", json=body).status_code == 400
+
+
+@pytest.mark.parametrize("term", ["%", "_", "\\"])
+def test_search_matches_wildcards_literally(app, client, term):
+    with app.app_context():
+        expected = Venue.query.filter(func.strpos(Venue.name, term) > 0).count()
+        db.session.remove()
+    response = client.get("/api/v1/search/venues", query_string={"q": term})
+    assert response.status_code == 200
+    assert response.get_json()["count"] == expected
+
+
+def test_edits_refresh_cached_json(client, reader, profiles, artist_form):
+    artist_id = profiles["artist_id"]
+    pages = [
+        f"/api/v1/artists/{artist_id}?fields=name",
+        f"/api/v1/artists?after={artist_id - 1}&limit=1&fields=name",
+    ]
+    for page in pages:
+        reader.get(page)
+        assert reader.get(page).headers["X-Cache"] == "HIT"
+
+    artist_form["name"] = "Fixture Renamed Trio"
+    client.post(f"/artists/{artist_id}/edit", data=artist_form)
+
+    assert reader.get(pages[0]).get_json() == {"name": "Fixture Renamed Trio"}
+    assert reader.get(pages[1]).get_json()["data"] == [{"name": "Fixture Renamed Trio"}]
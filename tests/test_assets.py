@@ -0,0 +1,22 @@
+import assets
+
+
+def test_fallback_css_minifier_leaves_strings_alone(monkeypatch):
+    monkeypatch.setattr(assets, "rcssmin", None)
+    source = """
+    /* comment */
+    a , b > c {
+        content: "x ,  ; { } /* kept */";
+        font-family: 'Open  Sans' ;
+    }
+    """
+    assert assets.minify_css(source) == (
+        """a,b>c{content: "x ,  ; { } /* kept */";font-family: 'Open  Sans';}"""
+    )
+
+
+def test_rebase_css_urls():
+    source = "a{background:url(../img/x.png?v=1)} b{src:url('data:x')}"
+    assert assets.rebase_css_urls(source, "/static/css") == (
+        "a{background:url(/static/img/x.png?v=1)} b{src:url('data:x')}"
+    )
@@ -0,0 +1,35 @@
+import os
+import time
+
+from cache import FileSystemBackend
+
+
+def test_filesystem_sweep_drops_expired_entries(tmp_path):
+    backend = FileSystemBackend(str(tmp_path))
+    backend.set("fresh", 1, ttl=60)
+    backend.set("kept", 2)
+    backend.set("stale", 3, ttl=60)
+    past = time.time() - 1
+    os.utime(backend._path("stale"), (past, past))
+
+    assert backend.sweep() == 1
+    assert backend.get("fresh") == 1
+    assert backend.get("kept") == 2
+    assert len(os.listdir(tmp_path)) == 2
+
+
+def test_filesystem_sweep_caps_entries(tmp_path):
+    backend = FileSystemBackend(str(tmp_path), max_entries=5, sweep_every=10)
+    for i in range(10):
+        backend.set(f"key{i}", i, ttl=60 + i)
+    # The tenth set swept down to the five expiring last.
+    assert sorted(os.listdir(tmp_path)) == sorted(
+        os.path.basename(backend._path(f"key{i}")) for i in range(5, 10)
+    )
+
+
+def test_undeclared_args_share_an_entry(cache, client):
+    assert client.get("/venues").headers["X-Cache"] == "MISS"
+    assert client.get("/venues?junk=1").headers["X-Cache"] == "HIT"
+    response = client.get("/venues?genre=Jazz")
+    assert response.headers["X-Cache"] == "MISS"
@@ -0,0 +1,36 @@
+import re
+
+from models import db, Venue
+
+NEW_VENUE = "Fixture New Venue"
+
+
+def facet_count(response, genre):
+    match = re.search(rf">{re.escape(genre)} \((\d+)\)<".encode(), response.data)
+    return int(match.group(1)) if match else 0
+
+
+def test_genre_filter_and_counts(client, profiles):
+    response = client.get("/venues?genre=Jazz")
+    assert b"Fixture Test Hall" in response.data
+    assert facet_count(response, "Jazz") >= 1
+    assert b"Fixture Test Hall" not in client.get("/venues?genre=Punk").data
+
+
+def test_new_venue_updates_the_facets(app, client, reader, venue_form):
+    reader.get("/venues")
+    response = reader.get("/venues")
+    assert response.headers["X-Cache"] == "HIT"
+    before = facet_count(response, "Musical Theatre")
+
+    venue_form.update(name=NEW_VENUE, genres=["Musical Theatre"])
+    try:
+        client.post("/venues/create", data=venue_form)
+        response = reader.get("/venues")
+        assert NEW_VENUE.encode() in response.data
+        assert facet_count(response, "Musical Theatre") == before + 1
+    finally:
+        with app.app_context():
+            Venue.query.filter_by(name=NEW_VENUE).delete()
+            db.session.commit()
+            db.session.remove()
@@ -0,0 +1,20 @@
+import pytest
+from sqlalchemy import func
+
+from models import db, Show
+
+# Planners sequentially scan and sort tables this small whatever indexes
+# exist, so the plans only mean something on a seeded database.
+MIN_SHOWS = 10000
+
+
+def test_hot_pages_use_show_indexes(app):
+    with app.app_context():
+        shows = db.session.query(func.count(Show.id)).scalar()
+        db.session.remove()
+    if shows < MIN_SHOWS:
+        pytest.skip(f"needs {MIN_SHOWS} shows (python -m benchmarks.seed)")
+
+    result = app.test_cli_runner().invoke(args=["check-indexes"])
+
+    assert result.exit_code == 0, result.output
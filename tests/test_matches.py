@@ -0,0 +1,23 @@
+def test_profile_edits_refresh_matches(
+    client, reader, profiles, venue_form, artist_form
+):
+    artist_id, venue_id = profiles["artist_id"], profiles["venue_id"]
+    artist_page = f"/artists/{artist_id}/matches"
+    venue_page = f"/venues/{venue_id}/matches"
+    client.post(
+        f"/artists/{artist_id}/edit", data={**artist_form, "seeking_venue": "y"}
+    )
+    reader.get(artist_page)
+    response = reader.get(artist_page)
+    assert response.headers["X-Cache"] == "HIT"
+    assert b"Fixture Test Hall" not in response.data
+
+    # Same genre, city and state: the best match either profile can have.
+    venue_form["seeking_talent"] = "y"
+    client.post(f"/venues/{venue_id}/edit", data=venue_form)
+    assert b"Fixture Test Hall" in reader.get(artist_page).data
+    assert b"Fixture Test Trio" in reader.get(venue_page).data
+
+    del venue_form["seeking_talent"]
+    client.post(f"/venues/{venue_id}/edit", data=venue_form)
+    assert b"Fixture Test Hall" not in reader.get(artist_page).data
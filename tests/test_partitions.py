@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+
+import partitions
+from models import db, Show, Venue
+
+# Old enough to be before any seeded show, so archiving it moves nothing else.
+ARCHIVED_MONTH = datetime(1990, 1, 1)
+
+
+def add_show(app, profiles, start_time):
+    with app.app_context():
+        db.session.add(Show(start_time=start_time, **profiles))
+        db.session.commit()
+        db.session.remove()
+
+
+def test_create_partition_moves_default_rows(app, profiles):
+    month = datetime(1990, 3, 1)
+    add_show(app, profiles, month + timedelta(days=3))
+    with app.app_context():
+        try:
+            with db.engine.begin() as conn:
+                assert partitions.ensure_partitions(conn, month, ahead=0) == [
+                    "shows_1990_03"
+                ]
+                rows = conn.execute(
+                    text(
+                        "SELECT tableoid::regclass::text FROM shows "
+                        "WHERE venue_id = :id"
+                    ),
+                    {"id": profiles["venue_id"]},
+                ).scalars()
+                assert list(rows) == ["shows_1990_03"]
+        finally:
+            db.session.execute(text("DROP TABLE IF EXISTS shows_1990_03"))
+            db.session.commit()
+
+
+def test_deleting_a_venue_deletes_its_live_shows(app, client, profiles):
+    add_show(app, profiles, datetime.now() + timedelta(days=30))
+    client.delete(f"/venues/{profiles['venue_id']}")
+    with app.app_context():
+        assert db.session.get(Venue, profiles["venue_id"]) is None
+        assert not Show.query.filter_by(venue_id=profiles["venue_id"]).count()
+
+
+def test_archived_shows_leave_the_pages_and_survive_deletes(
+    app, cache, client, profiles
+):
+    with app.app_context(), db.engine.begin() as conn:
+        partitions.create_partition(conn, ARCHIVED_MONTH)
+    add_show(app, profiles, ARCHIVED_MONTH + timedelta(days=14))
+    page = f"/venues/{profiles['venue_id']}"
+    artist_page = f"/artists/{profiles['artist_id']}"
+    archived = f"{partitions.ARCHIVE_SCHEMA}.shows_1990_01"
+    try:
+        client.get(page), client.get(artist_page)
+        response = client.get(page)
+        assert response.headers["X-Cache"] == "HIT"
+        assert b"Fixture Test Trio" in response.data
+        assert b"Fixture Test Hall" in client.get(artist_page).data
+
+        result = app.test_cli_runner().invoke(
+            args=["partition-shows", "--ahead", "0", "--archive-before", "1990-02"]
+        )
+        assert f"archived shows_1990_01 to {archived}" in result.output
+        assert b"Fixture Test Trio" not in client.get(page).data
+        assert b"Fixture Test Hall" not in client.get(artist_page).data
+
+        client.delete(page)
+        with app.app_context():
+            assert db.session.get(Venue, profiles["venue_id"]) is None
+            count = db.session.execute(text(f"SELECT count(*) FROM {archived}"))
+            assert count.scalar() == 1
+    finally:
+        with app.app_context():
+            db.session.execute(text(f"DROP TABLE IF EXISTS {archived}"))
+            db.session.execute(text("DROP TABLE IF EXISTS shows_1990_01"))
+            db.session.commit()
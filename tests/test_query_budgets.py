@@ -0,0 +1,84 @@
+import logging
+
+import pytest
+from sqlalchemy import select
+
+from instrumentation import QueryBudgetExceeded, query_stats_reported
+from models import db, Venue
+
+# A request to every endpoint in QUERY_BUDGETS: (endpoint, method, path).
+ROUTES = [
+    ("index", "GET", "/"),
+    ("venues", "GET", "/venues"),
+    ("venues", "GET", "/venues?genre=Jazz&genre=Blues&match=any"),
+    ("artists", "GET", "/artists"),
+    ("shows", "GET", "/shows"),
+    ("show_venue", "GET", "/venues/{venue_id}"),
+    ("show_artist", "GET", "/artists/{artist_id}"),
+    ("show_venue_past_shows", "GET", "/venues/{venue_id}/past_shows"),
+    ("show_artist_past_shows", "GET", "/artists/{artist_id}/past_shows"),
+    ("venue_matches", "GET", "/venues/{venue_id}/matches"),
+    ("artist_matches", "GET", "/artists/{artist_id}/matches"),
+    ("search_venues", "POST", "/venues/search"),
+    ("search_artists", "POST", "/artists/search"),
+    ("api.venues", "GET", "/api/v1/venues"),
+    ("api.venue", "GET", "/api/v1/venues/{venue_id}"),
+    ("api.artists", "GET", "/api/v1/artists"),
+    ("api.artist", "GET", "/api/v1/artists/{artist_id}"),
+    ("api.venue_batch", "GET", "/api/v1/venues/batch?ids=1,2,3&counts=1"),
+    ("api.artist_batch", "GET", "/api/v1/artists/batch?ids=1,2,3&counts=1"),
+    ("api.shows", "GET", "/api/v1/shows"),
+    ("api.search_venues", "GET", "/api/v1/search/venues?q=hall"),
+    ("api.search_artists", "GET", "/api/v1/search/artists?q=band"),
+]
+
+
+def test_every_budget_is_exercised(app):
+    assert {endpoint for endpoint, _, _ in ROUTES} == set(app.config["QUERY_BUDGETS"])
+
+
+@pytest.mark.parametrize("endpoint,method,path", ROUTES)
+def test_route_within_query_budget(app, client, ids, endpoint, method, path):
+    reported = []
+
+    def record(sender, endpoint, stats):
+        reported.append((endpoint, stats.count))
+
+    # With QUERY_BUDGET_STRICT, going over budget raises QueryBudgetExceeded.
+    with query_stats_reported.connected_to(record, app):
+        response = client.open(
+            path.format(**ids), method=method, data={"search_term": "a"}
+        )
+
+    assert response.status_code in (200, 404)
+    count = int(response.headers["X-DB-Query-Count"])
+    assert reported == [(endpoint, count)]
+    assert count <= app.config["QUERY_BUDGETS"][endpoint]
+
+
+@pytest.mark.parametrize("path", ["/venues", "/artists", "/shows"])
+def test_listing_over_budget_fails(app, client, path):
+    # The listing pages stream in production; they must still fail here.
+    app.config["QUERY_BUDGETS"] = dict(app.config["QUERY_BUDGETS"])
+    app.config["QUERY_BUDGETS"][path.strip("/")] = 0
+    with pytest.raises(QueryBudgetExceeded):
+        client.get(path)
+
+
+def test_repeated_statement_flagged_as_n_plus_one(app, caplog):
+    threshold = app.config["N_PLUS_ONE_THRESHOLD"]
+
+    def one_query_per_venue():
+        for venue_id in range(threshold):
+            db.session.execute(select(Venue.name).where(Venue.id == venue_id))
+        return "ok"
+
+    app.add_url_rule("/_n_plus_one", "n_plus_one", one_query_per_venue)
+    with caplog.at_level(logging.WARNING):
+        response = app.test_client().get("/_n_plus_one")
+
+    assert response.headers["X-DB-Query-Count"] == str(threshold)
+    assert any(
+        f"Suspected N+1 in n_plus_one: statement ran {threshold} times" in message
+        for message in caplog.messages
+    )
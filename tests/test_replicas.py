@@ -0,0 +1,43 @@
+import pytest
+from flask import g
+
+import config
+from app import create_app
+from cache import LRUBackend
+
+
+@pytest.fixture
+def replica_app(app, monkeypatch):
+    """An app whose one "replica" is the test database itself."""
+    monkeypatch.setattr(
+        config.TestingConfig,
+        "SQLALCHEMY_REPLICA_URIS",
+        [app.config["SQLALCHEMY_DATABASE_URI"]],
+    )
+    replica_app = create_app("testing")
+    replica_app.extensions["response_cache"].backend = LRUBackend()
+    yield replica_app
+    replica_app.extensions["db_replicas"].dispose()
+
+
+def test_reads_stick_to_the_primary_after_a_write(replica_app, profiles, venue_form):
+    replica = replica_app.extensions["db_replicas"].choose()
+    page = f"/venues/{profiles['venue_id']}"
+    with replica_app.test_client() as client:
+        client.get(page)
+        assert g.db_replica is replica
+
+        venue_form["name"] = "Fixture Renamed Hall"
+        response = client.post(f"{page}/edit", data=venue_form, follow_redirects=True)
+        assert g.get("db_replica") is None
+        assert b"Fixture Renamed Hall" in response.data
+
+        # No flash message is pending now, yet the page is still not shared.
+        response = client.get(page)
+        assert g.get("db_replica") is None
+        assert "X-Cache" not in response.headers
+
+        with client.session_transaction() as session:
+            session["primary_until"] = 0
+        client.get(page)
+        assert g.db_replica is replica
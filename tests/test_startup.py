@@ -0,0 +1,6 @@
+from benchmarks.startup import budget_failures, probe
+
+
+def test_startup_within_budget():
+    # No database needed: create_app() must not connect to one.
+    assert budget_failures(probe(3)) == []
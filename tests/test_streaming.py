@@ -0,0 +1,30 @@
+import pytest
+
+from instrumentation import query_stats_reported
+
+STREAMED = ["/venues", "/artists", "/shows"]
+
+
+@pytest.mark.parametrize("path", STREAMED)
+def test_streamed_page_reports_its_queries_once_sent(app, client, path):
+    rendered = client.get(path)
+    expected = int(rendered.headers["X-DB-Query-Count"])
+
+    app.config["QUERY_BUDGET_STRICT"] = False
+    reported = []
+
+    def receive(sender, endpoint, stats):
+        reported.append(stats.count)
+
+    with query_stats_reported.connected_to(receive, app):
+        response = client.get(path, buffered=False)
+        assert "X-DB-Query-Count" not in response.headers
+        chunks = list(response.response)
+        # The rows are fetched while the body is sent, inside the request
+        # context kept by stream_with_context.
+        assert reported == []
+        response.close()
+
+    assert len(chunks) > 1
+    assert b"".join(chunks) == rendered.data
+    assert reported == [expected]
@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+
+def cached_get(client, path):
+    """GET ``path`` until it is served from the cache."""
+    client.get(path)
+    response = client.get(path)
+    assert response.headers["X-Cache"] == "HIT"
+    return response
+
+
+@pytest.fixture
+def show(client, profiles):
+    """A show next month between the ``profiles`` venue and artist."""
+    start_time = datetime.now() + timedelta(days=30)
+    client.post(
+        "/shows/create",
+        data={**profiles, "start_time": start_time.strftime("%Y-%m-%d %H:%M:%S")},
+    )
+
+
+def test_venue_edit_refreshes_its_pages(client, reader, profiles, venue_form):
+    venue_id = profiles["venue_id"]
+    pages = [f"/venues/{venue_id}", "/venues"]
+    for page in pages:
+        assert b"Fixture Test Hall" in cached_get(reader, page).data
+
+    venue_form["name"] = "Fixture Renamed Hall"
+    client.post(f"/venues/{venue_id}/edit", data=venue_form)
+
+    for page in pages:
+        response = reader.get(page)
+        assert response.headers["X-Cache"] == "MISS"
+        assert b"Fixture Renamed Hall" in response.data
+
+
+def test_new_show_refreshes_both_pages(client, reader, profiles):
+    venue_page = f"/venues/{profiles['venue_id']}"
+    artist_page = f"/artists/{profiles['artist_id']}"
+    assert b"Fixture Test Trio" not in cached_get(reader, venue_page).data
+    assert b"Fixture Test Hall" not in cached_get(reader, artist_page).data
+
+    start_time = datetime.now() + timedelta(days=30)
+    client.post(
+        "/shows/create",
+        data={**profiles, "start_time": start_time.strftime("%Y-%m-%d %H:%M:%S")},
+    )
+
+    assert b"Fixture Test Trio" in reader.get(venue_page).data
+    assert b"Fixture Test Hall" in reader.get(artist_page).data
+
+
+def test_artist_edit_refreshes_its_venues(client, reader, profiles, show, artist_form):
+    venue_page = f"/venues/{profiles['venue_id']}"
+    assert b"Fixture Test Trio" in cached_get(reader, venue_page).data
+
+    artist_form["name"] = "Fixture Renamed Trio"
+    client.post(f"/artists/{profiles['artist_id']}/edit", data=artist_form)
+
+    assert b"Fixture Renamed Trio" in reader.get(venue_page).data
+
+
+def test_venue_delete_refreshes_its_artists(client, reader, profiles, show):
+    venue_page = f"/venues/{profiles['venue_id']}"
+    artist_page = f"/artists/{profiles['artist_id']}"
+    cached_get(reader, venue_page)
+    assert b"Fixture Test Hall" in cached_get(reader, artist_page).data
+
+    client.delete(venue_page)
+
+    assert reader.get(venue_page).status_code == 404
+    assert b"Fixture Test Hall" not in reader.get(artist_page).data
@@ -0,0 +1,12 @@
+"""WSGI entry point for production servers.
+
+gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+import os
+
+os.environ.setdefault("FYYUR_ENV", "production")
+
+from app import create_app  # noqa: E402
+
+app = create_app()